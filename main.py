@@ -22,11 +22,14 @@ Author: CIFE Educational Technology
 
 import streamlit as st
 import pandas as pd
+import copy
+import io
 import json
 import os
 import hashlib
 from datetime import datetime
 from typing import Optional, Dict, Any, List, Tuple
+from PIL import Image, ImageOps
 
 # =============================================================================
 # Import UI Components - Strict alignment with modules/ui_components.py
@@ -43,19 +46,24 @@ from modules.ui_components import (
     render_empty_state,
     render_card,
     render_info_box,
+    render_review_list,
     render_stat_card,
     render_option_card,
     render_card_button
 )
 
+from modules.openai_client import TRANSIENT_API_ERRORS, dumps_json, loads_json
 from modules.vision_processor import analyze_notebook_image, analyze_multiple_images
 from modules.content_generator import (
     generate_quiz,
     generate_quiz_from_analysis,
     generate_quiz_from_analysis_batched,
+    submit_quiz_batch,
+    retrieve_quiz_batch,
     quiz_to_dataframe,
     dataframe_to_quiz,
-    create_smart_blank
+    create_smart_blank,
+    DEFAULT_QUIZ_MODEL
 )
 from modules.gamification import (
     init_game_state,
@@ -98,120 +106,111 @@ STEP_EDITOR = "editor"
 STEP_PLAY = "play"
 STEP_RESULTS = "results"
 
+# Static card markup, kept on one line: indented multi-line HTML is sent
+# verbatim on every rerun and risks being parsed as a markdown code block
+_UPLOAD_INTRO_HTML = (
+    '<p style="color:#6B7280;margin:0;">Upload photos of handwritten student notebooks. '
+    'Our AI will analyze the content and generate personalized practice questions.</p>'
+)
+_UPLOAD_TIPS_HTML = (
+    '<ul style="color:#4338CA;padding-left:1.2rem;margin:0;">'
+    '<li>Use good lighting</li><li>Keep camera steady</li>'
+    '<li>Include full page</li><li>Avoid shadows</li></ul>'
+)
+_LOAD_QUIZ_INTRO_HTML = (
+    '<p style="color:#6B7280;margin:0;">Load a previously saved quiz (.json file) to edit or play again. '
+    'This restores all quiz data including any saved game progress.</p>'
+)
+_TEACHER_REVIEW_HTML = (
+    '<p style="margin:0;"><strong>👩‍🏫 Teacher Review:</strong> Edit questions, fix errors, or adjust difficulty below. '
+    'Double-click any cell to edit. This is your Human-in-the-Loop checkpoint.</p>'
+)
+_PLAY_CARD_HTML = (
+    '<div style="text-align:center;"><div style="font-size:4rem;">🎮</div>'
+    '<h2 style="color:#059669;font-family:\'Fredoka\',sans-serif;margin:0.5rem 0;">Play Game</h2>'
+    '<p style="color:#047857;margin:0;">Interactive quiz with scoring, streaks, and celebrations!</p></div>'
+)
+_DOWNLOAD_CARD_HTML = (
+    '<div style="text-align:center;"><div style="font-size:4rem;">📄</div>'
+    '<h2 style="color:#4F46E5;font-family:\'Fredoka\',sans-serif;margin:0.5rem 0;">Download</h2>'
+    '<p style="color:#4338CA;margin:0;">Get PDF or Word document for printing</p></div>'
+)
+
 
 # =============================================================================
 # Session State Initialization
 # =============================================================================
-def init_session_state():
-    """Initialize all session state variables for state persistence."""
-
+# Streamlit re-executes this script on every rerun, so this dict is rebuilt
+# each time (it is small); mutable defaults are copied per session.
+_SESSION_DEFAULTS: Dict[str, Any] = {
     # Game mode: "setup" or "play"
-    if "game_mode" not in st.session_state:
-        st.session_state.game_mode = "setup"
-
+    "game_mode": "setup",
     # Wizard step: follows 4-step linear path
-    if "wizard_step" not in st.session_state:
-        st.session_state.wizard_step = STEP_INGESTION
-
+    "wizard_step": STEP_INGESTION,
     # Score tracking
-    if "score" not in st.session_state:
-        st.session_state.score = 0
-
-    if "streak" not in st.session_state:
-        st.session_state.streak = 0
-
-    if "max_streak" not in st.session_state:
-        st.session_state.max_streak = 0
-
+    "score": 0,
+    "streak": 0,
+    "max_streak": 0,
     # Quiz data
-    if "quiz_data" not in st.session_state:
-        st.session_state.quiz_data = []
-
-    if "quiz_df" not in st.session_state:
-        st.session_state.quiz_df = None
-
+    "quiz_data": [],
+    "quiz_df": None,
     # Current question tracking
-    if "current_question_index" not in st.session_state:
-        st.session_state.current_question_index = 0
-
+    "current_question_index": 0,
     # Analysis results
-    if "analysis_result" not in st.session_state:
-        st.session_state.analysis_result = None
-
+    "analysis_result": None,
     # Answer state
-    if "answer_submitted" not in st.session_state:
-        st.session_state.answer_submitted = False
-
-    if "selected_answer" not in st.session_state:
-        st.session_state.selected_answer = None
-
-    if "user_text_answer" not in st.session_state:
-        st.session_state.user_text_answer = ""
-
+    "answer_submitted": False,
+    "selected_answer": None,
+    # Result of the submitted answer, kept for the feedback reruns
+    "answer_correct": False,
+    "user_text_answer": "",
     # Wrong answers for review
-    if "wrong_answers" not in st.session_state:
-        st.session_state.wrong_answers = []
-
+    "wrong_answers": [],
     # Quiz metadata
-    if "quiz_title" not in st.session_state:
-        st.session_state.quiz_title = "Practice Quiz"
-
-    if "quiz_subject" not in st.session_state:
-        st.session_state.quiz_subject = ""
-
-    if "quiz_grade" not in st.session_state:
-        st.session_state.quiz_grade = ""
-
+    "quiz_title": "Practice Quiz",
+    "quiz_subject": "",
+    "quiz_grade": "",
     # Uploaded files cache
-    if "uploaded_files" not in st.session_state:
-        st.session_state.uploaded_files = None
-
+    "uploaded_files": None,
     # Upload signature for caching analysis (avoid re-running extraction)
-    if "upload_signature" not in st.session_state:
-        st.session_state.upload_signature = None
-
+    "upload_signature": None,
     # Cached analysis signature to know if we already analyzed these files
-    if "analysis_signature" not in st.session_state:
-        st.session_state.analysis_signature = None
-
+    "analysis_signature": None,
+    # Bumped by "Re-analyze" so the cached vision result is bypassed
+    "analysis_refresh": 0,
+    # Vision detail level: "high" (default) or "low" for a quick scan
+    "vision_detail": "high",
     # Generation settings
-    if "mc_count" not in st.session_state:
-        st.session_state.mc_count = 5
-
-    if "tf_count" not in st.session_state:
-        st.session_state.tf_count = 3
-
-    if "sa_count" not in st.session_state:
-        st.session_state.sa_count = 2
-
+    "mc_count": 5,
+    "tf_count": 3,
+    "sa_count": 2,
     # Teacher mode (Human-in-the-Loop)
-    if "teacher_mode" not in st.session_state:
-        st.session_state.teacher_mode = False
-
+    "teacher_mode": False,
     # Sound and animation toggles
-    if "sound_enabled" not in st.session_state:
-        st.session_state.sound_enabled = True
-
-    if "animations_enabled" not in st.session_state:
-        st.session_state.animations_enabled = True
-
+    "sound_enabled": True,
+    "animations_enabled": True,
     # Generation state tracking (for two-stage pipeline)
-    if "generation_in_progress" not in st.session_state:
-        st.session_state.generation_in_progress = False
-
-    if "generation_progress" not in st.session_state:
-        st.session_state.generation_progress = 0
-
-    if "last_generation_settings" not in st.session_state:
-        st.session_state.last_generation_settings = None
-
+    "generation_in_progress": False,
+    "generation_progress": 0,
+    "last_generation_settings": None,
     # Quiz difficulty setting
-    if "quiz_difficulty" not in st.session_state:
-        st.session_state.quiz_difficulty = "medium"
-
+    "quiz_difficulty": "medium",
     # Language preference
-    if "quiz_language" not in st.session_state:
-        st.session_state.quiz_language = "auto"
+    "quiz_language": "auto",
+    # Batch API job queued from the Configure step (cheaper, up to 24h)
+    "pending_batch_id": None,
+    # Chat model used for quiz generation
+    "quiz_model": DEFAULT_QUIZ_MODEL,
+    # Generated quizzes keyed by _quiz_cache_key() (see _QUIZ_CACHE_SIZE)
+    "quiz_cache": {},
+}
+
+
+def init_session_state():
+    """Initialize all session state variables for state persistence."""
+    for key, default in _SESSION_DEFAULTS.items():
+        if key not in st.session_state:
+            st.session_state[key] = copy.copy(default)
 
 
 def get_current_step_index() -> int:
@@ -226,34 +225,48 @@ def get_current_step_index() -> int:
     return step_mapping.get(st.session_state.wizard_step, 0)
 
 
+# Per-quiz state cleared by "Start over"; API key, generation settings and
+# toggles are kept so the teacher doesn't have to re-enter them
+_RESET_KEYS = (
+    "game_mode",
+    "wizard_step",
+    "score",
+    "streak",
+    "max_streak",
+    "current_question_index",
+    "quiz_data",
+    "quiz_df",
+    "analysis_result",
+    "answer_submitted",
+    "selected_answer",
+    "answer_correct",
+    "user_text_answer",
+    "wrong_answers",
+    "uploaded_files",
+)
+
+
 def reset_to_setup():
     """Reset all state and return to setup mode (Ingestion step)."""
-    st.session_state.game_mode = "setup"
-    st.session_state.wizard_step = STEP_INGESTION
-    st.session_state.score = 0
-    st.session_state.streak = 0
-    st.session_state.max_streak = 0
-    st.session_state.current_question_index = 0
-    st.session_state.quiz_data = []
-    st.session_state.quiz_df = None
-    st.session_state.analysis_result = None
-    st.session_state.answer_submitted = False
-    st.session_state.selected_answer = None
-    st.session_state.user_text_answer = ""
-    st.session_state.wrong_answers = []
-    st.session_state.uploaded_files = None
+    # Single bulk update; a full clear() would also drop the API key
+    # override widget and the teacher's generation settings.
+    st.session_state.update({
+        key: copy.copy(_SESSION_DEFAULTS[key]) for key in _RESET_KEYS
+    })
 
 
 def start_game():
     """Transition from setup to play mode."""
-    st.session_state.game_mode = "play"
-    st.session_state.wizard_step = STEP_PLAY
-    st.session_state.current_question_index = 0
-    st.session_state.score = 0
-    st.session_state.streak = 0
-    st.session_state.max_streak = 0
-    st.session_state.wrong_answers = []
-    st.session_state.answer_submitted = False
+    st.session_state.update({
+        "game_mode": "play",
+        "wizard_step": STEP_PLAY,
+        "current_question_index": 0,
+        "score": 0,
+        "streak": 0,
+        "max_streak": 0,
+        "wrong_answers": [],
+        "answer_submitted": False
+    })
 
 
 # =============================================================================
@@ -298,7 +311,13 @@ def render_sidebar():
                 render_info_box("API key loaded from secrets", variant="success", icon="🔐")
         else:
             render_info_box("API key required to proceed (set OPENAI_API_KEY in Streamlit Secrets)", variant="warning", icon="⚠️")
-# Reset button
+
+        # Pending Batch API quiz - lives in the sidebar so it survives Start Over
+        if st.session_state.pending_batch_id:
+            st.divider()
+            _render_pending_batch(api_key)
+
+        # Reset button
         st.divider()
         if st.button("🔄 Start Over", width="stretch"):
             reset_to_setup()
@@ -307,22 +326,74 @@ def render_sidebar():
         return api_key
 
 
+def _render_pending_batch(api_key: str):
+    """Show the queued Batch API job and load its questions once it completes."""
+    batch_id = st.session_state.pending_batch_id
+    render_info_box(f"Batch quiz queued: {batch_id}", variant="info", icon="⏳")
+
+    col_check, col_discard = st.columns(2)
+    with col_check:
+        check_btn = st.button("🔄 Check", key="check_batch_btn", width="stretch")
+    with col_discard:
+        if st.button("🗑️ Discard", key="discard_batch_btn", width="stretch"):
+            st.session_state.pending_batch_id = None
+            st.rerun()
+
+    if not check_btn:
+        return
+
+    try:
+        questions = retrieve_quiz_batch(batch_id, api_key)
+    except TRANSIENT_API_ERRORS as fetch_error:
+        # The job itself may still be fine; keep its ID so Check can be retried
+        render_info_box(f"Couldn't reach OpenAI, please check again: {str(fetch_error)[:150]}", variant="warning", icon="⚠️")
+        return
+    except Exception as batch_error:
+        st.session_state.pending_batch_id = None
+        render_info_box(f"Batch failed: {str(batch_error)[:150]}", variant="error", icon="❌")
+        return
+
+    if questions is None:
+        render_info_box("Still processing. Batches finish within 24 hours.", variant="info", icon="⏳")
+        return
+
+    if not questions:
+        st.session_state.pending_batch_id = None
+        render_info_box("The batch finished without usable questions. Please generate again.", variant="error", icon="❌")
+        return
+
+    st.session_state.update({
+        "pending_batch_id": None,
+        "quiz_data": questions,
+        "quiz_df": quiz_to_dataframe(questions),
+        "game_mode": "setup",
+        "wizard_step": STEP_EDITOR
+    })
+    st.rerun()
+
+
 # =============================================================================
 # Helper: Compute upload signature for caching
 # =============================================================================
 def _compute_upload_signature(files) -> str:
     """
     Compute a signature from uploaded files to detect changes.
-    Uses MD5 hash of file contents for reliable change detection.
+
+    Streamlit gives every upload a unique file_id, so the signature is built
+    from metadata without reading the images; this runs on every rerun of
+    the upload step. Objects without a file_id fall back to an MD5 of the
+    contents.
     """
     if not files:
         return ""
     sig_parts = []
     for f in files:
+        file_id = getattr(f, "file_id", None)
+        if file_id:
+            sig_parts.append(f"{f.name}:{file_id}")
+            continue
         try:
-            f.seek(0)
-            content = f.read()
-            f.seek(0)
+            content = f.getvalue()
             file_hash = hashlib.md5(content).hexdigest()[:12]
             sig_parts.append(f"{f.name}:{len(content)}:{file_hash}")
         except Exception:
@@ -330,6 +401,96 @@ def _compute_upload_signature(files) -> str:
     return "|".join(sorted(sig_parts))
 
 
+# Quiz generation model choices shown on the Configure step
+_QUIZ_MODEL_OPTIONS = {
+    "⚡ Fast (gpt-4o-mini)": "gpt-4o-mini",
+    "🎯 Accurate (gpt-4o)": "gpt-4o",
+}
+
+# Generated quizzes are kept per session rather than in st.cache_data: the
+# generator reports progress into page elements, which cached functions
+# cannot replay. Enough for a few back-and-forth tweaks of the settings.
+_QUIZ_CACHE_SIZE = 8
+
+
+def _quiz_cache_key(
+    analysis: Dict[str, Any],
+    mc_count: int,
+    tf_count: int,
+    sa_count: int,
+    model: str
+) -> str:
+    """Hash the analysis, question counts and model that fully determine a generation request."""
+    payload = json.dumps(
+        {"analysis": analysis, "counts": [mc_count, tf_count, sa_count], "model": model},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@st.cache_data(max_entries=32, ttl=3600, show_spinner=False)
+def _cached_analyze_images(
+    image_blobs: Tuple[Tuple[str, bytes], ...],
+    _api_key: str,
+    refresh_token: int = 0,
+    detail: str = "high"
+) -> Dict[str, Any]:
+    """
+    Cached vision analysis keyed by the uploaded image contents.
+
+    Identical uploads skip the GPT-4o Vision call entirely. The API key is
+    excluded from the cache key; refresh_token forces a fresh analysis.
+    detail is part of the key so a quick scan never masks a full one.
+    Only complete analyses are cached: any page error is raised instead.
+    """
+    image_files = []
+    for name, data in image_blobs:
+        image_file = io.BytesIO(data)
+        image_file.name = name
+        image_files.append(image_file)
+
+    if len(image_files) == 1:
+        result = analyze_notebook_image(image_files[0], _api_key, detail=detail)
+    else:
+        result = analyze_multiple_images(image_files, _api_key, detail=detail)
+
+    # Raising keeps a failed or partial analysis (a 429 on one page, an
+    # unparseable reply) out of the cache, so a retry calls the API again
+    failures = [
+        page["error"]
+        for page in [result, *result.get("individual_analyses", [])]
+        if page.get("error")
+    ]
+    if failures:
+        raise RuntimeError(failures[0])
+    return result
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _cached_thumbnail(image_bytes: bytes, max_dimension: int) -> bytes:
+    """
+    Shrink an uploaded photo to a preview-sized image.
+
+    The upload previews are re-sent to the browser on every rerun, so a
+    column-sized copy replaces the multi-MB original. max_dimension should
+    roughly match the preview column width so handwriting stays legible.
+    Undecodable files are returned unchanged.
+    """
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((max_dimension, max_dimension))
+            buffer = io.BytesIO()
+            if img.mode in ("RGBA", "LA", "P"):
+                img.save(buffer, format="PNG")  # keep transparency
+            else:
+                img.convert("RGB").save(buffer, format="JPEG", quality=70)
+    except (OSError, ValueError):
+        return image_bytes
+    return buffer.getvalue()
+
+
 def _validate_quiz_data(quiz_data: List[Dict]) -> Tuple[bool, List[str]]:
     """
     Validate quiz data structure and return validation status with warnings.
@@ -370,9 +531,24 @@ def _validate_quiz_data(quiz_data: List[Dict]) -> Tuple[bool, List[str]]:
     return is_valid, warnings
 
 
+def _render_warning_list(warnings: List[str], limit: int):
+    """Render up to `limit` validation warnings as one markdown list element."""
+    lines = [f"- {w}" for w in warnings[:limit]]
+    if len(warnings) > limit:
+        lines.append(f"- ...and {len(warnings) - limit} more")
+    st.warning("\n".join(lines))
+
+
 # =============================================================================
 # Step 1: Ingestion (Upload)
 # =============================================================================
+def _centered_button(label: str, **kwargs) -> bool:
+    """Render a full-width button in the middle of a 1:2:1 column row."""
+    _, center, _ = st.columns([1, 2, 1])
+    with center:
+        return st.button(label, width="stretch", **kwargs)
+
+
 def render_ingestion_step(api_key: str):
     """Render the image upload (Ingestion) step."""
 
@@ -392,12 +568,7 @@ def render_ingestion_step(api_key: str):
 
         with col1:
             render_card(
-                content="""
-                <p style="color: #6B7280; margin: 0;">
-                    Upload photos of handwritten student notebooks. Our AI will analyze
-                    the content and generate personalized practice questions.
-                </p>
-                """,
+                content=_UPLOAD_INTRO_HTML,
                 title="📸 Upload Images"
             )
 
@@ -418,45 +589,47 @@ def render_ingestion_step(api_key: str):
                     icon="✓"
                 )
 
-                # Show previews
+                # Show previews (small cached thumbnails, not the full photos)
                 cols = st.columns(min(len(uploaded_files), 4))
+                # One or two previews fill half the page or more
+                preview_size = 1024 if len(cols) <= 2 else 512
                 for i, file in enumerate(uploaded_files[:4]):
                     with cols[i]:
-                        st.image(file, caption=f"Image {i+1}", width="stretch")
+                        st.image(
+                            _cached_thumbnail(file.getvalue(), preview_size),
+                            caption=f"Image {i+1}",
+                            width="stretch"
+                        )
+
+            quick_scan = st.checkbox(
+                "⚡ Quick scan (lower detail, fewer tokens)",
+                value=st.session_state.vision_detail == "low",
+                help="Fine for large, clear handwriting. Leave off for dense or small notes."
+            )
 
         with col2:
             render_card(
-                content="""
-                <ul style="color: #4338CA; padding-left: 1.2rem; margin: 0;">
-                    <li>Use good lighting</li>
-                    <li>Keep camera steady</li>
-                    <li>Include full page</li>
-                    <li>Avoid shadows</li>
-                </ul>
-                """,
+                content=_UPLOAD_TIPS_HTML,
                 title="💡 Tips for best results",
                 variant="warning"
             )
 
         # Next button - triggers visual update of progress circles
-        col1, col2, col3 = st.columns([1, 2, 1])
-        with col2:
-            if st.button(
-                "🔍 Analyze Notebook →",
-                width="stretch",
-                disabled=not uploaded_files or not api_key
-            ):
-                st.session_state.wizard_step = STEP_EXTRACTION
-                st.rerun()
+        if _centered_button(
+            "🔍 Analyze Notebook →",
+            disabled=not uploaded_files or not api_key
+        ):
+            detail = "low" if quick_scan else "high"
+            if detail != st.session_state.vision_detail:
+                # Same images at a different detail level need a fresh read
+                st.session_state.vision_detail = detail
+                st.session_state.analysis_result = None
+            st.session_state.wizard_step = STEP_EXTRACTION
+            st.rerun()
 
     with tab2:
         render_card(
-            content="""
-            <p style="color: #6B7280; margin: 0;">
-                Load a previously saved quiz (.json file) to edit or play again.
-                This restores all quiz data including any saved game progress.
-            </p>
-            """,
+            content=_LOAD_QUIZ_INTRO_HTML,
             title="💾 Load Saved Quiz"
         )
 
@@ -505,10 +678,7 @@ def render_ingestion_step(api_key: str):
                     # Show validation warnings
                     if warnings:
                         with st.expander(f"⚠️ {len(warnings)} validation warning(s)"):
-                            for w in warnings[:10]:
-                                st.warning(w)
-                            if len(warnings) > 10:
-                                st.info(f"...and {len(warnings) - 10} more")
+                            _render_warning_list(warnings, limit=10)
 
                     # Show game state if available
                     if game_state and game_state.get("current_index", 0) > 0:
@@ -615,6 +785,7 @@ def render_extraction_step(api_key: str):
             if st.button("🔄 Re-analyze", key="reanalyze_btn", width="stretch"):
                 st.session_state.analysis_signature = None
                 st.session_state.analysis_result = None
+                st.session_state.analysis_refresh += 1
                 st.rerun()
 
     if need_analysis:
@@ -634,16 +805,15 @@ def render_extraction_step(api_key: str):
 
                 # Analyze images with defensive error handling
                 try:
-                    if len(st.session_state.uploaded_files) == 1:
-                        analysis = analyze_notebook_image(
-                            st.session_state.uploaded_files[0],
-                            api_key
-                        )
-                    else:
-                        analysis = analyze_multiple_images(
-                            st.session_state.uploaded_files,
-                            api_key
-                        )
+                    image_blobs = tuple(
+                        (f.name, f.getvalue()) for f in st.session_state.uploaded_files
+                    )
+                    analysis = _cached_analyze_images(
+                        image_blobs,
+                        api_key,
+                        refresh_token=st.session_state.analysis_refresh,
+                        detail=st.session_state.vision_detail
+                    )
                 except Exception as api_error:
                     error_msg = str(api_error).lower()
                     if "rate limit" in error_msg or "429" in error_msg:
@@ -779,6 +949,28 @@ def render_extraction_step(api_key: str):
                 help=f"Detected: {detected_lang}"
             )
 
+        model_ids = list(_QUIZ_MODEL_OPTIONS.values())
+        model_label = st.radio(
+            "Generation model",
+            options=list(_QUIZ_MODEL_OPTIONS),
+            index=model_ids.index(st.session_state.quiz_model) if st.session_state.quiz_model in model_ids else 0,
+            horizontal=True,
+            help="Fast is quicker and much cheaper; Accurate can write subtler distractors"
+        )
+        quiz_model = _QUIZ_MODEL_OPTIONS[model_label]
+
+        batch_mode = st.checkbox(
+            "💰 Batch mode (50% cheaper, ready within 24h)",
+            value=False,
+            help="Queue the quiz through the OpenAI Batch API and collect it later from the sidebar"
+        )
+
+        force_regenerate = st.checkbox(
+            "🔁 Force regenerate",
+            value=False,
+            help="Ignore questions already generated for these notes and settings"
+        )
+
         # Show total and batch info
         if total > 0:
             batch_count = (total - 1) // 15 + 1
@@ -816,6 +1008,7 @@ def render_extraction_step(api_key: str):
         st.session_state.tf_count = tf_count
         st.session_state.sa_count = sa_count
         st.session_state.quiz_difficulty = difficulty
+        st.session_state.quiz_model = quiz_model
         st.session_state.quiz_language = language if language != "auto" else analysis.get("language", "English")
 
         # Store generation settings for reference
@@ -825,9 +1018,34 @@ def render_extraction_step(api_key: str):
             "sa_count": sa_count,
             "difficulty": difficulty,
             "language": st.session_state.quiz_language,
+            "model": quiz_model,
             "timestamp": datetime.now().isoformat()
         }
 
+        if batch_mode:
+            try:
+                st.session_state.pending_batch_id = submit_quiz_batch(
+                    analysis,
+                    api_key,
+                    mc_count=mc_count,
+                    tf_count=tf_count,
+                    sa_count=sa_count,
+                    model=quiz_model
+                )
+            except Exception as batch_error:
+                st.error(f"⚠️ Could not queue batch: {str(batch_error)[:150]}")
+                return
+            st.rerun()
+
+        cache_key = _quiz_cache_key(analysis, mc_count, tf_count, sa_count, quiz_model)
+        quiz_cache = st.session_state.quiz_cache
+        if not force_regenerate and cache_key in quiz_cache:
+            questions = copy.deepcopy(quiz_cache[cache_key])
+            st.session_state.quiz_data = questions
+            st.session_state.quiz_df = quiz_to_dataframe(questions)
+            st.session_state.wizard_step = STEP_EDITOR
+            st.rerun()
+
         # Generate quiz with batched generation for large counts
         progress_container = st.empty()
         status_container = st.empty()
@@ -847,7 +1065,8 @@ def render_extraction_step(api_key: str):
                 tf_count=tf_count,
                 sa_count=sa_count,
                 batch_size=15,
-                progress_callback=update_progress
+                progress_callback=update_progress,
+                model=quiz_model
             )
 
             progress_container.empty()
@@ -862,6 +1081,11 @@ def render_extraction_step(api_key: str):
             else:
                 status_container.success(f"✅ Successfully generated {len(questions)} questions!")
 
+            quiz_cache.pop(cache_key, None)
+            quiz_cache[cache_key] = copy.deepcopy(questions)
+            while len(quiz_cache) > _QUIZ_CACHE_SIZE:
+                quiz_cache.pop(next(iter(quiz_cache)))
+
             st.session_state.quiz_data = questions
             st.session_state.quiz_df = quiz_to_dataframe(questions)
             st.session_state.wizard_step = STEP_EDITOR
@@ -903,12 +1127,7 @@ def render_editor_step():
     render_wizard_steps(WIZARD_STEPS, current_step=2)
 
     render_card(
-        content="""
-        <p style="margin: 0;">
-            <strong>👩‍🏫 Teacher Review:</strong> Edit questions, fix errors, or adjust difficulty below.
-            Double-click any cell to edit. This is your Human-in-the-Loop checkpoint.
-        </p>
-        """,
+        content=_TEACHER_REVIEW_HTML,
         variant="warning"
     )
 
@@ -917,10 +1136,7 @@ def render_editor_step():
         is_valid, warnings = _validate_quiz_data(st.session_state.quiz_data)
         if warnings:
             with st.expander(f"⚠️ {len(warnings)} validation issue(s) - Click to review"):
-                for w in warnings[:15]:
-                    st.warning(w)
-                if len(warnings) > 15:
-                    st.info(f"...and {len(warnings) - 15} more")
+                _render_warning_list(warnings, limit=15)
 
     # Data editor for questions - Human-in-the-Loop verification
     if st.session_state.quiz_df is not None:
@@ -995,19 +1211,60 @@ def render_editor_step():
 @st.cache_data(show_spinner=False)
 def _cached_create_pdf(quiz_data_json: str, title: str, subject: str, grade: str, include_answers: bool) -> bytes:
     """Cached PDF generation to avoid regenerating on every render."""
-    import json
-    quiz_data = json.loads(quiz_data_json)
+    quiz_data = loads_json(quiz_data_json)
     return create_pdf(quiz_data, title=title, subject=subject, grade=grade, include_answers=include_answers)
 
 
 @st.cache_data(show_spinner=False)
 def _cached_create_docx(quiz_data_json: str, title: str, subject: str, grade: str) -> bytes:
     """Cached DOCX generation to avoid regenerating on every render."""
-    import json
-    quiz_data = json.loads(quiz_data_json)
+    quiz_data = loads_json(quiz_data_json)
     return create_docx(quiz_data, title=title, subject=subject, grade=grade)
 
 
+@st.cache_data(max_entries=16, ttl=3600, show_spinner=False)
+def _cached_create_json_export(
+    quiz_data_json: str,
+    created_at: str,
+    metadata: Dict[str, Any],
+    analysis_result: Optional[Dict[str, Any]],
+    quiz_settings: Optional[Dict[str, Any]]
+) -> str:
+    """
+    Cached JSON export to avoid re-serializing the quiz on every render.
+
+    created_at comes from the caller (when this version of the quiz was
+    built), so a cache hit never carries another build's timestamp.
+    """
+    quiz_data = loads_json(quiz_data_json)
+    return create_json_export(
+        quiz_data,
+        metadata=metadata,
+        analysis_result=analysis_result,
+        quiz_settings=quiz_settings,
+        game_state=None,  # No game state on initial export
+        created_at=created_at
+    )
+
+
+def _quiz_data_json(quiz_data: List[Dict]) -> Tuple[str, str]:
+    """
+    JSON for the export cache keys, re-serialized only when the quiz changes.
+
+    Every edit replaces quiz_data with a new list, so identity is enough to
+    detect a change; the memo keeps a reference to that list so its id is
+    never reused while cached.
+
+    Returns:
+        (quiz JSON, ISO timestamp of when this version was first seen)
+    """
+    memo = st.session_state.get("_quiz_json_memo")
+    if memo is None or memo[0] is not quiz_data:
+        memo = (quiz_data, dumps_json(quiz_data), datetime.now().isoformat())
+        st.session_state["_quiz_json_memo"] = memo
+    return memo[1], memo[2]
+
+
 def render_action_step():
     """Render the action selection step (Publication or Play)."""
 
@@ -1023,13 +1280,7 @@ def render_action_step():
 
     with col1:
         render_card(
-            content="""
-            <div style="text-align: center;">
-                <div style="font-size: 4rem;">🎮</div>
-                <h2 style="color: #059669; font-family: 'Fredoka', sans-serif; margin: 0.5rem 0;">Play Game</h2>
-                <p style="color: #047857; margin: 0;">Interactive quiz with scoring, streaks, and celebrations!</p>
-            </div>
-            """,
+            content=_PLAY_CARD_HTML,
             variant="success"
         )
 
@@ -1039,17 +1290,11 @@ def render_action_step():
 
     with col2:
         render_card(
-            content="""
-            <div style="text-align: center;">
-                <div style="font-size: 4rem;">📄</div>
-                <h2 style="color: #4F46E5; font-family: 'Fredoka', sans-serif; margin: 0.5rem 0;">Download</h2>
-                <p style="color: #4338CA; margin: 0;">Get PDF or Word document for printing</p>
-            </div>
-            """
+            content=_DOWNLOAD_CARD_HTML
         )
 
         # Serialize quiz data for caching (makes it hashable)
-        quiz_data_json = json.dumps(st.session_state.quiz_data, ensure_ascii=False)
+        quiz_data_json, quiz_built_at = _quiz_data_json(st.session_state.quiz_data)
 
         # Download options - using cached generation
         dcol1, dcol2 = st.columns(2)
@@ -1116,9 +1361,10 @@ def render_action_step():
                 render_info_box(f"DOCX error: {str(e)[:50]}", variant="error", icon="⚠️")
 
         with dcol4:
-            # JSON export with full state (lightweight, no caching needed)
-            json_data = create_json_export(
-                st.session_state.quiz_data,
+            # JSON export with full state - cached like the documents
+            json_data = _cached_create_json_export(
+                quiz_data_json,
+                quiz_built_at,
                 metadata={
                     "title": st.session_state.quiz_title,
                     "subject": st.session_state.quiz_subject,
@@ -1126,8 +1372,7 @@ def render_action_step():
                     "language": st.session_state.get("quiz_language", "English"),
                 },
                 analysis_result=st.session_state.analysis_result,
-                quiz_settings=st.session_state.get("last_generation_settings"),
-                game_state=None  # No game state on initial export
+                quiz_settings=st.session_state.get("last_generation_settings")
             )
             st.download_button(
                 "💾 JSON Data",
@@ -1146,8 +1391,14 @@ def render_action_step():
 # =============================================================================
 # Interactive Play Mode
 # =============================================================================
+@st.fragment
 def render_play_mode():
-    """Render the interactive quiz game."""
+    """
+    Render the interactive quiz game.
+
+    Runs as a fragment: answering and advancing (button callbacks) only
+    rerun this panel. Leaving play (results) still triggers a full-app rerun.
+    """
 
     quiz_data = st.session_state.quiz_data
     current_idx = st.session_state.current_question_index
@@ -1189,11 +1440,11 @@ def render_play_mode():
 
     # Question card
     q_type = current_q.get("question_type", "multiple_choice")
-    q_text = current_q.get("question_text", "")
-
-    # Apply smart blank for short answer
-    if q_type == "short_answer":
-        q_text = create_smart_blank(q_text, current_q.get("correct_answer", ""))
+    q_text = _question_display_text(
+        q_type,
+        current_q.get("question_text", ""),
+        current_q.get("correct_answer", "")
+    )
 
     # Render question badge via UI component
     render_question_badge(q_type)
@@ -1212,14 +1463,8 @@ def render_play_mode():
         else:
             render_sa_input(current_q)
     else:
-        # Show feedback via UI component
-        is_correct = check_answer(
-            st.session_state.selected_answer,
-            current_q.get("correct_answer_index", 0),
-            st.session_state.user_text_answer,
-            current_q.get("correct_answer", ""),
-            q_type
-        )
+        # Show feedback via UI component (graded once in process_answer)
+        is_correct = st.session_state.answer_correct
 
         render_feedback(
             is_correct,
@@ -1232,38 +1477,38 @@ def render_play_mode():
                 show_confetti()
 
         # Next button
-        col1, col2, col3 = st.columns([1, 2, 1])
-        with col2:
-            if current_idx + 1 < total_questions:
-                if st.button("Next Question →", width="stretch"):
-                    st.session_state.current_question_index += 1
-                    st.session_state.answer_submitted = False
-                    st.session_state.selected_answer = None
-                    st.session_state.user_text_answer = ""
-                    st.rerun()
-            else:
-                if st.button("🏆 See Results", width="stretch"):
-                    st.session_state.wizard_step = STEP_RESULTS
-                    st.rerun()
+        if current_idx + 1 < total_questions:
+            _centered_button("Next Question →", on_click=_next_question)
+        elif _centered_button("🏆 See Results"):
+            st.session_state.wizard_step = STEP_RESULTS
+            st.rerun()
+
+
+_MC_OPTION_LABELS = ("A", "B", "C", "D")
+
+
+def _question_display_text(q_type: str, question_text: str, answer: str) -> str:
+    """Question text as shown in play mode (short answers get a smart blank)."""
+    if q_type == "short_answer":
+        return create_smart_blank(question_text, answer)
+    return question_text
 
 
 def render_mc_options(question: dict):
     """Render multiple choice options using UI components."""
     options = question.get("options", [])
-    labels = ["A", "B", "C", "D"]
 
     col1, col2 = st.columns(2)
 
     for i, opt in enumerate(options):
         with col1 if i % 2 == 0 else col2:
-            if st.button(
-                f"{labels[i]}. {opt}",
+            st.button(
+                f"{_MC_OPTION_LABELS[i]}. {opt}",
                 key=f"mc_opt_{i}",
-                width="stretch"
-            ):
-                st.session_state.selected_answer = i
-                process_answer(question, i)
-                st.rerun()
+                width="stretch",
+                on_click=_submit_choice,
+                args=(question, i)
+            )
 
 
 def render_tf_options(question: dict):
@@ -1271,16 +1516,10 @@ def render_tf_options(question: dict):
     col1, col2 = st.columns(2)
 
     with col1:
-        if st.button("✓ True", key="tf_true", width="stretch"):
-            st.session_state.selected_answer = 0
-            process_answer(question, 0)
-            st.rerun()
+        st.button("✓ True", key="tf_true", width="stretch", on_click=_submit_choice, args=(question, 0))
 
     with col2:
-        if st.button("✗ False", key="tf_false", width="stretch"):
-            st.session_state.selected_answer = 1
-            process_answer(question, 1)
-            st.rerun()
+        st.button("✗ False", key="tf_false", width="stretch", on_click=_submit_choice, args=(question, 1))
 
 
 def render_sa_input(question: dict):
@@ -1291,12 +1530,36 @@ def render_sa_input(question: dict):
         placeholder="Type your answer here..."
     )
 
-    col1, col2, col3 = st.columns([1, 2, 1])
-    with col2:
-        if st.button("Submit Answer", width="stretch", disabled=not user_answer):
-            st.session_state.user_text_answer = user_answer
-            process_answer(question, -1, user_answer)
-            st.rerun()
+    _centered_button(
+        "Submit Answer",
+        disabled=not user_answer,
+        on_click=_submit_text_answer,
+        args=(question,)
+    )
+
+
+# Button callbacks run before the fragment reruns, so the new state is
+# rendered in a single pass instead of handler + st.rerun().
+def _submit_choice(question: dict, selected_idx: int):
+    """Record a multiple choice / true-false pick."""
+    st.session_state.selected_answer = selected_idx
+    process_answer(question, selected_idx)
+
+
+def _submit_text_answer(question: dict):
+    """Record the typed short answer."""
+    user_answer = st.session_state.sa_input
+    st.session_state.user_text_answer = user_answer
+    process_answer(question, -1, user_answer)
+
+
+def _next_question():
+    """Advance to the next question and clear the answer state."""
+    st.session_state.current_question_index += 1
+    st.session_state.answer_submitted = False
+    st.session_state.answer_correct = False
+    st.session_state.selected_answer = None
+    st.session_state.user_text_answer = ""
 
 
 def process_answer(question: dict, selected_idx: int, user_text: str = ""):
@@ -1321,6 +1584,7 @@ def process_answer(question: dict, selected_idx: int, user_text: str = ""):
         st.session_state.streak = 0
         st.session_state.wrong_answers.append(question)
 
+    st.session_state.answer_correct = is_correct
     st.session_state.answer_submitted = True
 
 
@@ -1378,12 +1642,7 @@ def render_results_step():
             title="📚 Review These Questions"
         )
 
-        for i, q in enumerate(st.session_state.wrong_answers):
-            with st.expander(f"Question: {q.get('question_text', '')[:50]}..."):
-                render_info_box(f"Question: {q.get('question_text', '')}", variant="info")
-                render_info_box(f"Correct Answer: {q.get('correct_answer', '')}", variant="success")
-                if q.get('explanation'):
-                    render_info_box(f"Explanation: {q.get('explanation', '')}", variant="info", icon="💡")
+        render_review_list(st.session_state.wrong_answers)
 
     # Action buttons
     col1, col2, col3 = st.columns([1, 1, 1])
@@ -4,6 +4,8 @@ CIFE Edu-Suite - Modules Package
 Central module exports for the CIFE educational application.
 """
 
+from .openai_client import get_openai_client, loads_json, dumps_json, TRANSIENT_API_ERRORS
+
 from .vision_processor import (
     analyze_notebook_image,
     analyze_multiple_images,
@@ -15,9 +17,12 @@ from .content_generator import (
     generate_quiz,
     generate_quiz_from_analysis,
     generate_quiz_from_analysis_batched,
+    submit_quiz_batch,
+    retrieve_quiz_batch,
     quiz_to_dataframe,
     dataframe_to_quiz,
-    create_smart_blank
+    create_smart_blank,
+    DEFAULT_QUIZ_MODEL
 )
 
 from .ui_components import (
@@ -62,6 +67,12 @@ from .exporter import (
 )
 
 __all__ = [
+    # OpenAI client
+    'get_openai_client',
+    'loads_json',
+    'dumps_json',
+    'TRANSIENT_API_ERRORS',
+
     # Vision processor
     'analyze_notebook_image',
     'analyze_multiple_images',
@@ -72,9 +83,12 @@ __all__ = [
     'generate_quiz',
     'generate_quiz_from_analysis',
     'generate_quiz_from_analysis_batched',
+    'submit_quiz_batch',
+    'retrieve_quiz_batch',
     'quiz_to_dataframe',
     'dataframe_to_quiz',
     'create_smart_blank',
+    'DEFAULT_QUIZ_MODEL',
 
     # UI components
     'load_custom_css',
@@ -9,10 +9,97 @@ with intelligent distractors based on common student misconceptions.
 import json
 import math
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import Dict, Any, List, Optional
 from openai import OpenAI
+from .openai_client import TRANSIENT_API_ERRORS, get_openai_client, loads_json
 import pandas as pd
 
+# Output budget: a question with options, explanation and misconception tag
+# runs ~150-200 tokens (more in Spanish), plus the JSON wrapper. True/false
+# and short answer items carry fewer or no options.
+_TOKENS_PER_QUESTION = {
+    "multiple_choice": 250,
+    "true_false": 200,
+    "short_answer": 180
+}
+_DEFAULT_TOKENS_PER_QUESTION = 250
+_TOKENS_OVERHEAD = 200
+_MAX_QUIZ_TOKENS = 4000
+
+# Default quiz model; with the strict response schema below gpt-4o-mini
+# produces well-formed quizzes at a fraction of gpt-4o's latency and cost
+DEFAULT_QUIZ_MODEL = "gpt-4o-mini"
+
+# Type mix used when a caller gives only a total question count
+_DEFAULT_TYPE_SHARES = {
+    "multiple_choice": 0.5,
+    "true_false": 0.3,
+    "short_answer": 0.2
+}
+
+# Type codes used by the batched generator
+_BATCH_TYPE_NAMES = {
+    "mc": "multiple_choice",
+    "tf": "true_false",
+    "sa": "short_answer",
+}
+
+# Structured Outputs schema for quiz responses: the model is constrained to
+# exactly this shape, so a response never fails to parse or drops a field.
+# Short answers use options [] and correct_answer_index -1.
+_QUIZ_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "quiz",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "questions": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "question_text": {"type": "string"},
+                            "question_type": {
+                                "type": "string",
+                                "enum": ["multiple_choice", "true_false", "short_answer"]
+                            },
+                            "options": {"type": "array", "items": {"type": "string"}},
+                            "correct_answer_index": {"type": "integer"},
+                            "correct_answer": {"type": "string"},
+                            "explanation": {"type": "string"},
+                            "misconception_tag": {"type": "string"}
+                        },
+                        "required": [
+                            "question_text",
+                            "question_type",
+                            "options",
+                            "correct_answer_index",
+                            "correct_answer",
+                            "explanation",
+                            "misconception_tag"
+                        ],
+                        "additionalProperties": False
+                    }
+                }
+            },
+            "required": ["questions"],
+            "additionalProperties": False
+        }
+    }
+}
+
+# Batched generation: size cap on the per-type worker pool (there are at most
+# three type jobs, one request in flight each) and backoff between top-up
+# attempts that failed on a rate limit, timeout or connection error
+_MAX_CONCURRENT_BATCHES = 3
+_RETRY_BACKOFF_BASE = 1.0
+_RETRY_BACKOFF_MAX = 8.0
+
 
 def generate_quiz(
     text: str,
@@ -22,10 +109,13 @@ def generate_quiz(
     subject: str = "General",
     language: str = "English",
     core_concept: str = "",
-    question_types: Optional[Dict[str, int]] = None
+    question_types: Optional[Dict[str, int]] = None,
+    progress_callback: Optional[callable] = None,
+    model: str = DEFAULT_QUIZ_MODEL,
+    client: Optional[OpenAI] = None
 ) -> List[Dict[str, Any]]:
     """
-    Generate a pedagogically-sound quiz from the given text using GPT-4o.
+    Generate a pedagogically-sound quiz from the given text.
 
     The quiz uses common student misconceptions for distractors,
     adjusts vocabulary based on grade level, and provides explanations.
@@ -40,6 +130,12 @@ def generate_quiz(
         core_concept: Main concept being assessed
         question_types: Dict specifying counts per type
             e.g., {"multiple_choice": 5, "true_false": 3, "short_answer": 2}
+        progress_callback: Optional callback(questions_started); when given,
+            the response is streamed and the callback fires as each question
+            begins arriving
+        model: Chat model to generate with (default DEFAULT_QUIZ_MODEL)
+        client: Already-resolved client; callers on worker threads pass one
+            because the cached get_openai_client needs a script run context
 
     Returns:
         List of question dictionaries with the schema:
@@ -65,26 +161,68 @@ def generate_quiz(
     if not text or not text.strip():
         raise ValueError("Source text is required to generate questions")
 
-    client = OpenAI(api_key=api_key)
+    if client is None:
+        client = get_openai_client(api_key)
 
-    # Default question type distribution if not specified
-    if question_types is None:
-        mc_count = max(1, int(num_questions * 0.5))
-        tf_count = max(1, int(num_questions * 0.3))
-        sa_count = num_questions - mc_count - tf_count
-        question_types = {
-            "multiple_choice": mc_count,
-            "true_false": tf_count,
-            "short_answer": sa_count
-        }
+    request_body = _build_quiz_request(
+        text, grade, num_questions, subject, language, core_concept, question_types, model
+    )
 
-    # Grade-level vocabulary guidance
-    vocabulary_guidance = _get_vocabulary_guidance(grade)
+    try:
+        if progress_callback is None:
+            response = client.chat.completions.create(**request_body)
+            content = response.choices[0].message.content
+        else:
+            content = _stream_quiz_content(client, request_body, progress_callback)
+        return _parse_quiz_content(content)
 
-    # Language-specific instructions
-    lang_instruction = ""
-    if language.lower() == "spanish":
-        lang_instruction = """
+    except json.JSONDecodeError as e:
+        raise Exception(f"Failed to parse quiz response: {str(e)}") from e
+    except Exception as e:
+        raise Exception(f"Quiz generation failed: {str(e)}") from e
+
+
+def _stream_quiz_content(client, request_body: Dict[str, Any], progress_callback: callable) -> str:
+    """
+    Stream a quiz completion and report how many questions have started.
+
+    Args:
+        client: OpenAI client
+        request_body: Keyword arguments from _build_quiz_request()
+        progress_callback: Called with the running question count
+
+    Returns:
+        The full message content
+    """
+    marker = '"question_text"'
+    content = ""
+    search_from = 0
+    started = 0
+
+    for chunk in client.chat.completions.create(stream=True, **request_body):
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            continue
+        content += chunk.choices[0].delta.content
+
+        # Each question object opens with its question_text key; only scan
+        # the new tail (plus enough overlap to catch a key split across chunks)
+        found = content.find(marker, search_from)
+        if found == -1:
+            search_from = max(search_from, len(content) - len(marker) + 1)
+            continue
+        while found != -1:
+            started += 1
+            search_from = found + len(marker)
+            found = content.find(marker, search_from)
+        progress_callback(started)
+
+    return content
+
+
+# Quiz prompts, filled in with str.format per request. The system prompt
+# only depends on the source material, so every batch of one quiz sends
+# the same text (see _build_quiz_request)
+_SPANISH_INSTRUCTION = """
 IMPORTANT: Generate ALL content in Spanish, including:
 - Questions
 - Answer options
@@ -93,8 +231,7 @@ IMPORTANT: Generate ALL content in Spanish, including:
 
 Use appropriate Spanish educational terminology."""
 
-    # Build the system prompt
-    system_prompt = f"""You are an expert educational content creator specializing in K-12 curriculum.
+_QUIZ_SYSTEM_PROMPT = """You are an expert educational content creator specializing in K-12 curriculum.
 Your task is to generate high-quality quiz questions that:
 1. Are age-appropriate for Grade {grade} students
 2. Test understanding of the core concept: "{core_concept}"
@@ -114,13 +251,13 @@ PEDAGOGICAL GUIDELINES FOR DISTRACTORS:
 - For Language Arts: Use grammar mistakes students frequently make
 - NEVER use obviously wrong or silly answers
 
-QUESTION DISTRIBUTION:
-- Multiple Choice: {question_types.get('multiple_choice', 0)} questions (4 options each, labeled A-D)
-- True/False: {question_types.get('true_false', 0)} questions
-- Short Answer: {question_types.get('short_answer', 0)} questions (answer should be 1-3 words)
+QUESTION FORMATS:
+- Multiple Choice: 4 options each, labeled A-D
+- True/False: two options, true first then false
+- Short Answer: answer should be 1-3 words
 
-OUTPUT FORMAT - Respond ONLY with a valid JSON array:
-[
+OUTPUT FORMAT - Respond ONLY with a valid JSON object holding a "questions" array:
+{{"questions": [
     {{
         "question_text": "What is the result of 24 ÷ 6?",
         "question_type": "multiple_choice",
@@ -148,68 +285,147 @@ OUTPUT FORMAT - Respond ONLY with a valid JSON array:
         "explanation": "In a division problem like 24 ÷ 6, the dividend (24) is the number being divided.",
         "misconception_tag": "Confusing dividend and divisor"
     }}
-]
+]}}
 
 CRITICAL REQUIREMENTS:
 1. Generate EXACTLY the number of questions requested for each type
 2. Each question must have a unique misconception_tag
 3. Explanations should be educational and encouraging
 4. Short answer correct_answer should be 1-3 words maximum
-5. All content must directly relate to the provided source text"""
+5. All content must directly relate to the provided source text
+6. For multiple choice and true/false, correct_answer_index is authoritative (0-based into options)"""
 
-    user_prompt = f"""Based on the following student notes/content, generate a quiz:
+_QUIZ_USER_PROMPT = """Based on the following student notes/content, generate a quiz:
 
 ---SOURCE CONTENT---
 {text}
 ---END CONTENT---
 
 Generate:
-- {question_types.get('multiple_choice', 0)} multiple choice questions
-- {question_types.get('true_false', 0)} true/false questions
-- {question_types.get('short_answer', 0)} short answer questions
+- {mc_count} multiple choice questions
+- {tf_count} true/false questions
+- {sa_count} short answer questions
 
 Total: {num_questions} questions
 
 Remember: Use real student misconceptions as distractors, not random errors."""
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            max_tokens=4000,
-            temperature=0.7
-        )
-
-        content = response.choices[0].message.content.strip()
-
-        # Clean up potential markdown
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-
-        # Parse JSON
-        questions = json.loads(content)
-
-        # Validate and normalize each question
-        validated_questions = []
-        for i, q in enumerate(questions):
-            validated_q = _validate_question(q, i)
-            if validated_q:
-                validated_questions.append(validated_q)
-
-        return validated_questions
 
-    except json.JSONDecodeError as e:
-        raise Exception(f"Failed to parse quiz response: {str(e)}")
-    except Exception as e:
-        raise Exception(f"Quiz generation failed: {str(e)}")
+def _apportion(total: int, weights: List[float]) -> List[int]:
+    """
+    Split an integer total by weight using largest remainders.
+
+    The counts always sum to total and are never negative, unlike
+    independently rounded shares.
+    """
+    weight_sum = sum(weights)
+    if total <= 0 or weight_sum <= 0:
+        return [0] * len(weights)
+
+    quotas = [total * w / weight_sum for w in weights]
+    counts = [int(q) for q in quotas]
+    by_remainder = sorted(range(len(weights)), key=lambda i: quotas[i] - counts[i], reverse=True)
+    for i in by_remainder[:total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+def _quiz_token_budget(num_questions: int, question_types: Dict[str, int]) -> int:
+    """Output token cap for a request, sized by the mix of question types asked for."""
+    typed = sum(question_types.values())
+    budget = _TOKENS_OVERHEAD + sum(
+        _TOKENS_PER_QUESTION.get(q_type, _DEFAULT_TOKENS_PER_QUESTION) * count
+        for q_type, count in question_types.items()
+    )
+    # Any questions not covered by the per-type counts get the default share
+    budget += _DEFAULT_TOKENS_PER_QUESTION * max(0, num_questions - typed)
+    return min(_MAX_QUIZ_TOKENS, budget)
+
+
+def _build_quiz_request(
+    text: str,
+    grade: str,
+    num_questions: int,
+    subject: str = "General",
+    language: str = "English",
+    core_concept: str = "",
+    question_types: Optional[Dict[str, int]] = None,
+    model: str = DEFAULT_QUIZ_MODEL
+) -> Dict[str, Any]:
+    """
+    Build the Chat Completions request body for a quiz.
+
+    Shared by the synchronous path and the Batch API path so both send
+    exactly the same prompt. See generate_quiz() for the arguments.
+
+    Returns:
+        Keyword arguments for client.chat.completions.create()
+    """
+    # Default question type distribution if not specified
+    if question_types is None:
+        question_types = dict(zip(
+            _DEFAULT_TYPE_SHARES,
+            _apportion(num_questions, list(_DEFAULT_TYPE_SHARES.values()))
+        ))
+
+    # Grade-level vocabulary guidance
+    vocabulary_guidance = _get_vocabulary_guidance(grade)
+
+    # Language-specific instructions
+    lang_instruction = _SPANISH_INSTRUCTION if language.lower() == "spanish" else ""
+
+    system_prompt = _QUIZ_SYSTEM_PROMPT.format(
+        grade=grade,
+        core_concept=core_concept,
+        vocabulary_guidance=vocabulary_guidance,
+        subject=subject,
+        lang_instruction=lang_instruction
+    )
+
+    user_prompt = _QUIZ_USER_PROMPT.format(
+        text=text,
+        mc_count=question_types.get("multiple_choice", 0),
+        tf_count=question_types.get("true_false", 0),
+        sa_count=question_types.get("short_answer", 0),
+        num_questions=num_questions
+    )
+
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        "max_tokens": _quiz_token_budget(num_questions, question_types),
+        "temperature": 0.7,
+        "response_format": _QUIZ_RESPONSE_FORMAT
+    }
+
+
+def _parse_quiz_content(content: str) -> List[Dict[str, Any]]:
+    """
+    Parse and validate the JSON body of a quiz completion.
+
+    Args:
+        content: Message content returned by the model
+
+    Returns:
+        List of validated question dictionaries
+
+    Raises:
+        json.JSONDecodeError: If the content is not valid JSON
+    """
+    # Structured Outputs guarantee a bare object, so no fence stripping is needed
+    questions = loads_json(content).get("questions", [])
+
+    # Validate and normalize each question
+    validated_questions = []
+    for i, q in enumerate(questions):
+        validated_q = _validate_question(q, i)
+        if validated_q:
+            validated_questions.append(validated_q)
+
+    return validated_questions
 
 
 def _get_vocabulary_guidance(grade: str) -> str:
@@ -262,7 +478,7 @@ def _validate_question(question: Dict, index: int) -> Optional[Dict]:
     Returns None if the question is invalid.
     Supports: multiple_choice, true_false, short_answer, matching, fill_in_blank
     """
-    required_fields = ["question_text", "question_type", "correct_answer"]
+    required_fields = ["question_text", "question_type"]
 
     # Check required fields
     for field in required_fields:
@@ -333,6 +549,20 @@ def _validate_question(question: Dict, index: int) -> Optional[Dict]:
     else:  # short_answer
         question["options"] = []
 
+    # For choice questions the index is authoritative: take the answer text
+    # from the options so a mistyped correct_answer can't break grading
+    correct_idx = question.get("correct_answer_index")
+    if (
+        q_type in ("multiple_choice", "true_false")
+        and type(correct_idx) is int
+        and 0 <= correct_idx < len(question["options"])
+        and question["options"][correct_idx]
+    ):
+        question["correct_answer"] = question["options"][correct_idx]
+
+    if not question.get("correct_answer"):
+        return None
+
     # Ensure correct_answer_index exists and is valid
     if "correct_answer_index" not in question:
         if q_type == "multiple_choice" and question["correct_answer"] in question.get("options", []):
@@ -401,6 +631,157 @@ def generate_quiz_from_analysis(
     )
 
 
+def submit_quiz_batch(
+    analysis: Dict[str, Any],
+    api_key: str,
+    mc_count: int = 5,
+    tf_count: int = 3,
+    sa_count: int = 2,
+    batch_size: int = 15,
+    model: str = DEFAULT_QUIZ_MODEL
+) -> str:
+    """
+    Queue quiz generation through the OpenAI Batch API.
+
+    Batch requests cost half as much as synchronous calls but may take up
+    to 24 hours; use retrieve_quiz_batch() to collect the result.
+
+    Args:
+        analysis: Result from analyze_notebook_image()
+        api_key: OpenAI API key
+        mc_count: Number of multiple choice questions
+        tf_count: Number of true/false questions
+        sa_count: Number of short answer questions
+        batch_size: Maximum questions per request line (default 15)
+        model: Chat model to generate with (default DEFAULT_QUIZ_MODEL)
+
+    Returns:
+        Batch ID to poll with retrieve_quiz_batch()
+
+    Raises:
+        ValueError: If API key or source text is missing
+    """
+    if not api_key or not api_key.strip():
+        raise ValueError("OpenAI API key is required")
+
+    text = analysis.get("transcribed_text", "")
+    if not text or not text.strip():
+        raise ValueError("Source text is required to generate questions")
+
+    # One request per question type, split at batch_size like the
+    # synchronous path; custom_id carries the type for retrieve_quiz_batch()
+    batch_lines = []
+    for question_type, count in (
+        ("multiple_choice", mc_count),
+        ("true_false", tf_count),
+        ("short_answer", sa_count),
+    ):
+        for part, start in enumerate(range(0, int(count), batch_size)):
+            request_n = min(batch_size, int(count) - start)
+            request_body = _build_quiz_request(
+                text=text,
+                grade=analysis.get("detected_grade_level", "5"),
+                num_questions=request_n,
+                subject=analysis.get("subject", "General"),
+                language=analysis.get("language", "English"),
+                core_concept=analysis.get("core_concept", ""),
+                question_types={question_type: request_n},
+                model=model
+            )
+            batch_lines.append(json.dumps({
+                "custom_id": f"quiz-{question_type}-{part}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": request_body
+            }))
+
+    if not batch_lines:
+        raise ValueError("At least one question is required")
+
+    client = get_openai_client(api_key)
+    batch_file = client.files.create(
+        file=("quiz_batch.jsonl", "\n".join(batch_lines).encode("utf-8")),
+        purpose="batch"
+    )
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    return batch.id
+
+
+def retrieve_quiz_batch(batch_id: str, api_key: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Collect the questions from a batch queued by submit_quiz_batch().
+
+    Args:
+        batch_id: ID returned by submit_quiz_batch()
+        api_key: OpenAI API key
+
+    Returns:
+        List of question dictionaries, or None if the batch is still running.
+        Expired or cancelled batches still return whatever lines finished.
+
+    Raises:
+        Exception: If the batch ended without any output file
+    """
+    client = get_openai_client(api_key)
+    batch = client.batches.retrieve(batch_id)
+
+    if batch.status in ("validating", "in_progress", "finalizing", "cancelling"):
+        return None
+    if not batch.output_file_id:
+        raise Exception(f"Batch {batch_id} ended with status '{batch.status}'")
+
+    output = client.files.content(batch.output_file_id).text
+
+    # Output lines come back in any order; regroup them by custom_id
+    results = {}
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        response = result.get("response") or {}
+        if response.get("status_code") != 200:
+            continue
+        results[result.get("custom_id", "")] = response["body"]["choices"][0]["message"]["content"]
+
+    type_order = {"multiple_choice": 0, "true_false": 1, "short_answer": 2}
+
+    def _line_key(custom_id: str):
+        # "quiz-<question_type>-<part>"; older single-line batches used "quiz-0"
+        parts = custom_id.split("-")
+        if len(parts) == 3 and parts[2].isdigit():
+            return parts[1], int(parts[2])
+        return "", 0
+
+    questions = []
+    seen = set()
+    for custom_id in sorted(results, key=lambda c: (type_order.get(_line_key(c)[0], 3), _line_key(c)[1])):
+        question_type = _line_key(custom_id)[0]
+        try:
+            line_questions = _parse_quiz_content(results[custom_id])
+        except (json.JSONDecodeError, ValueError, TypeError) as e:
+            # A truncated or refused line (content None) shouldn't cost the
+            # lines that did parse
+            print(f"Skipping unparseable batch line {custom_id}: {e}")
+            continue
+        for q in line_questions:
+            # Each line asked for one type; _validate_question has already
+            # checked the options against the model's own label, so an item
+            # of another type is dropped rather than relabelled unchecked
+            if question_type in type_order and q["question_type"] != question_type:
+                continue
+            key = " ".join(q.get("question_text", "").lower().split())
+            if key in seen:
+                continue
+            seen.add(key)
+            questions.append(q)
+
+    return questions
+
+
 def generate_quiz_from_analysis_batched(
     analysis: Dict[str, Any],
     api_key: str,
@@ -408,7 +789,8 @@ def generate_quiz_from_analysis_batched(
     tf_count: int = 3,
     sa_count: int = 2,
     batch_size: int = 15,
-    progress_callback: Optional[callable] = None
+    progress_callback: Optional[callable] = None,
+    model: str = DEFAULT_QUIZ_MODEL
 ) -> List[Dict[str, Any]]:
     """
     Generate a quiz from a vision analysis result using batched API calls.
@@ -425,6 +807,7 @@ def generate_quiz_from_analysis_batched(
         sa_count: Number of short answer questions
         batch_size: Maximum questions per API call (default 15)
         progress_callback: Optional callback(current, total) for UI progress
+        model: Chat model to generate with (default DEFAULT_QUIZ_MODEL)
 
     Returns:
         List of question dictionaries (unique by normalized question_text)
@@ -439,23 +822,67 @@ def generate_quiz_from_analysis_batched(
     all_questions: List[Dict[str, Any]] = []
     seen_questions = set()
 
+    # The per-type loops run on worker threads; they share the question
+    # list and dedup set, and report streaming progress through in_flight.
+    # Streamlit calls (progress_callback, the cached client lookup) stay on
+    # the calling thread.
+    lock = threading.Lock()
+    # A blank key is left for generate_quiz to reject with its usual error
+    client = get_openai_client(api_key) if api_key and api_key.strip() else None
+    in_flight: Dict[str, int] = {}
+    type_counts: Dict[str, int] = {}
+    last_reported = [-1]
+
     def _norm(s: str) -> str:
         s = (s or "").strip().lower()
         s = re.sub(r"\s+", " ", s)
         return s
 
     def _append_unique(q: Dict[str, Any]) -> bool:
+        # Caller holds the lock
         q_text = _norm(q.get("question_text", ""))
-        if not q_text:
-            return False
-        if q_text in seen_questions:
+        if not q_text or q_text in seen_questions:
             return False
         seen_questions.add(q_text)
         all_questions.append(q)
-        if progress_callback:
-            progress_callback(len(all_questions), total_requested)
+        q_type = q.get("question_type")
+        type_counts[q_type] = type_counts.get(q_type, 0) + 1
         return True
 
+    def _merge_batch(key: str, batch, question_type: str, is_full) -> int:
+        # Add the batch and drop its in-flight count in one locked step, so
+        # the progress poll never sees the questions missing from both
+        added = 0
+        with lock:
+            for q in (batch or []):
+                if is_full():
+                    break
+                q["question_type"] = question_type
+                if _append_unique(q):
+                    added += 1
+            in_flight.pop(key, None)
+        return added
+
+    def _stream_progress_for(key: str):
+        if not progress_callback:
+            return None
+
+        def _batch_progress(started: int):
+            # Intra-batch progress while a streamed batch is still arriving
+            with lock:
+                in_flight[key] = started
+
+        return _batch_progress
+
+    def _report_progress():
+        if not progress_callback:
+            return
+        with lock:
+            current = min(len(all_questions) + sum(in_flight.values()), total_requested)
+        if current != last_reported[0]:
+            last_reported[0] = current
+            progress_callback(current, total_requested)
+
     def _overshoot_buffer(remaining: int) -> int:
         # Small overshoot reduces the chance we end short due to duplicates/invalid items.
         if remaining <= 3:
@@ -468,11 +895,7 @@ def generate_quiz_from_analysis_batched(
         if target <= 0:
             return
 
-        expected_type = {
-            "mc": "multiple_choice",
-            "tf": "true_false",
-            "sa": "short_answer",
-        }[type_code]
+        expected_type = _BATCH_TYPE_NAMES[type_code]
 
         # Safety: don't loop forever if the model keeps failing.
         max_attempts = max(6, math.ceil(target / max(1, batch_size)) + 4)
@@ -480,17 +903,13 @@ def generate_quiz_from_analysis_batched(
         stagnant_rounds = 0  # rounds with zero new unique questions
 
         while attempts < max_attempts:
-            current_type_count = sum(1 for q in all_questions if q.get("question_type") == expected_type)
-            remaining = target - current_type_count
+            remaining = target - type_counts.get(expected_type, 0)
             if remaining <= 0:
                 break
 
             request_n = min(batch_size, remaining + _overshoot_buffer(remaining))
-            question_types = {
-                "multiple_choice": request_n if type_code == "mc" else 0,
-                "true_false": request_n if type_code == "tf" else 0,
-                "short_answer": request_n if type_code == "sa" else 0,
-            }
+            # Types left out of the dict default to 0 in the prompt
+            question_types = {expected_type: request_n}
 
             try:
                 batch = generate_quiz(
@@ -502,22 +921,30 @@ def generate_quiz_from_analysis_batched(
                     language=language,
                     core_concept=core_concept,
                     question_types=question_types,
+                    progress_callback=_stream_progress_for(type_code),
+                    model=model,
+                    client=client,
                 )
             except Exception as e:
                 print(f"Batch generation failed for {type_code}: {e}")
+                with lock:
+                    in_flight.pop(type_code, None)
+                # A bad key, missing source text or unparseable reply won't
+                # fix itself; give up on this type straight away
+                if not isinstance(e.__cause__ or e, TRANSIENT_API_ERRORS):
+                    break
                 attempts += 1
+                # The SDK has already retried 429s and dropped connections with
+                # backoff; give the rate limit window more room before retrying
+                time.sleep(min(_RETRY_BACKOFF_BASE * 2 ** (attempts - 1), _RETRY_BACKOFF_MAX))
                 continue
 
-            added = 0
-            for q in (batch or []):
-                # Enforce expected type (models can sometimes mislabel).
-                q["question_type"] = expected_type
-                if _append_unique(q):
-                    added += 1
-                # Stop early if we already reached target for this type.
-                current_type_count = sum(1 for qq in all_questions if qq.get("question_type") == expected_type)
-                if current_type_count >= target:
-                    break
+            # Enforce expected type (models can sometimes mislabel) and stop
+            # early once this type has reached its target
+            added = _merge_batch(
+                type_code, batch, expected_type,
+                lambda: type_counts.get(expected_type, 0) >= target
+            )
 
             if added == 0:
                 stagnant_rounds += 1
@@ -530,10 +957,18 @@ def generate_quiz_from_analysis_batched(
 
             attempts += 1
 
-    # Generate each type with "top-up" behavior
-    _generate_for_type("mc", int(mc_count))
-    _generate_for_type("tf", int(tf_count))
-    _generate_for_type("sa", int(sa_count))
+    # Generate each type with "top-up" behavior; the types are independent
+    # requests, so run them side by side instead of one after another
+    targets = [("mc", int(mc_count)), ("tf", int(tf_count)), ("sa", int(sa_count))]
+    jobs = [(code, target) for code, target in targets if target > 0]
+    if jobs:
+        with ThreadPoolExecutor(max_workers=min(len(jobs), _MAX_CONCURRENT_BATCHES)) as executor:
+            pending = {executor.submit(_generate_for_type, code, target) for code, target in jobs}
+            while pending:
+                done, pending = wait(pending, timeout=0.25)
+                for future in done:
+                    future.result()
+                _report_progress()
 
     # Final safety: if we're still short (rare), attempt one generic top-up pass.
     if len(all_questions) < total_requested:
@@ -553,14 +988,23 @@ def generate_quiz_from_analysis_batched(
                     "true_false": 0,
                     "short_answer": 0,
                 },
+                progress_callback=_stream_progress_for("top_up"),
+                model=model,
+                client=client,
+            )
+            _merge_batch(
+                "top_up", batch, "multiple_choice",
+                lambda: len(all_questions) >= total_requested
             )
-            for q in (batch or []):
-                q["question_type"] = "multiple_choice"
-                _append_unique(q)
-                if len(all_questions) >= total_requested:
-                    break
         except Exception as e:
             print(f"Final top-up batch failed: {e}")
+            with lock:
+                in_flight.pop("top_up", None)
+        _report_progress()
+
+    # Types finish in any order; keep the quiz grouped MC, TF, SA
+    type_order = {"multiple_choice": 0, "true_false": 1, "short_answer": 2}
+    all_questions.sort(key=lambda q: type_order.get(q.get("question_type"), 3))
 
     # Trim any overshoot
     return all_questions[:total_requested]
@@ -610,6 +1054,16 @@ def quiz_to_dataframe(questions: List[Dict[str, Any]]) -> pd.DataFrame:
     return pd.DataFrame(rows)
 
 
+# Short type codes teachers may type into the editor's Type column
+_EDITOR_TYPE_ALIASES = {
+    "mc": "multiple_choice",
+    "tf": "true_false",
+    "sa": "short_answer",
+    "match": "matching",
+    "fib": "fill_in_blank"
+}
+
+
 def dataframe_to_quiz(df: pd.DataFrame) -> List[Dict[str, Any]]:
     """
     Convert an edited DataFrame back to quiz format.
@@ -624,19 +1078,13 @@ def dataframe_to_quiz(df: pd.DataFrame) -> List[Dict[str, Any]]:
     """
     questions = []
 
-    for _, row in df.iterrows():
+    # Plain dicts instead of iterrows(), which builds a Series per row
+    for row in df.to_dict("records"):
         q_type = str(row.get("Type", "multiple_choice")).lower().replace(" ", "_")
         correct_answer = str(row.get("Correct Answer", ""))
 
         # Normalize question type
-        type_map = {
-            "mc": "multiple_choice",
-            "tf": "true_false",
-            "sa": "short_answer",
-            "match": "matching",
-            "fib": "fill_in_blank"
-        }
-        q_type = type_map.get(q_type, q_type)
+        q_type = _EDITOR_TYPE_ALIASES.get(q_type, q_type)
 
         # Build options based on question type
         if q_type == "multiple_choice":
@@ -696,6 +1144,11 @@ def dataframe_to_quiz(df: pd.DataFrame) -> List[Dict[str, Any]]:
     return questions
 
 
+# A run of two or more underscores or a [blank] marker, replaced whole;
+# single underscores are usually part of the text ("H_2O", "a_b")
+_BLANK_PLACEHOLDER_RE = re.compile(r"_{2,}|\[blank\]", re.IGNORECASE)
+
+
 def create_smart_blank(question_text: str, answer: str) -> str:
     """
     Create a visual blank that hints at the answer length.
@@ -707,16 +1160,18 @@ def create_smart_blank(question_text: str, answer: str) -> str:
     Returns:
         Question text with formatted blank
     """
-    blank_length = len(answer)
-    visual_blank = " _ " * min(blank_length, 10)
+    blank_length = min(len(answer), 10)
+    # "_  _  _" for a three-letter answer, built without the strip() copy
+    visual_blank = "_" + "  _" * (blank_length - 1) if blank_length else ""
 
-    # Replace common blank placeholders
-    for placeholder in ["_____", "____", "___", "__", "_", "[blank]", "[BLANK]"]:
-        if placeholder in question_text:
-            return question_text.replace(placeholder, visual_blank.strip())
+    # Replace blank placeholders (underscore runs or [blank])
+    blanked, count = _BLANK_PLACEHOLDER_RE.subn(visual_blank, question_text)
+    if count:
+        return blanked
 
-    # If no placeholder found, append the blank
-    if not any(p in question_text for p in ["_", "[blank]"]):
-        return question_text + f" {visual_blank.strip()}"
+    # A lone underscore is the placeholder only when nothing longer is present
+    if "_" in question_text:
+        return question_text.replace("_", visual_blank)
 
-    return question_text
+    # If no placeholder found, append the blank
+    return question_text + " " + visual_blank
@@ -14,12 +14,109 @@ Supports enhanced JSON schema with:
 import io
 import json
 import re
+import zipfile
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
+from xml.sax.saxutils import escape as xml_escape
+
+from .openai_client import dumps_json, loads_json
 
 # Schema version for JSON exports - increment when format changes
 QUIZ_SCHEMA_VERSION = "2.0"
 
+# Multiple-choice option labels
+_OPTION_LABELS = ("A", "B", "C", "D")
+
+# Question type badges shown before each question
+_TYPE_BADGES = {
+    "multiple_choice": "[MC]",
+    "true_false": "[T/F]",
+    "short_answer": "[SA]",
+    "matching": "[Match]",
+    "fill_in_blank": "[Fill]"
+}
+
+# -----------------------------------------------------------------------------
+# DOCX package parts (the fixed XML around the generated document body)
+# -----------------------------------------------------------------------------
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+# Control characters are not allowed anywhere in an XML document
+_XML_INVALID_CHARS_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_DOCX_CONTENT_TYPES = (
+    _XML_DECLARATION
+    + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    '</Types>'
+)
+
+_DOCX_PACKAGE_RELS = (
+    _XML_DECLARATION
+    + '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+_DOCX_DOCUMENT_RELS = (
+    _XML_DECLARATION
+    + '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# Arial 11pt body text plus the Title and Heading 1 styles used by create_docx
+_DOCX_STYLES = (
+    _XML_DECLARATION
+    + f'<w:styles xmlns:w="{_W_NS}">'
+    '<w:docDefaults>'
+    '<w:rPrDefault><w:rPr>'
+    '<w:rFonts w:ascii="Arial" w:hAnsi="Arial" w:eastAsia="Arial" w:cs="Arial"/>'
+    '<w:sz w:val="22"/><w:szCs w:val="22"/>'
+    '</w:rPr></w:rPrDefault>'
+    '<w:pPrDefault><w:pPr><w:spacing w:after="120" w:line="259" w:lineRule="auto"/></w:pPr></w:pPrDefault>'
+    '</w:docDefaults>'
+    '<w:style w:type="paragraph" w:default="1" w:styleId="Normal">'
+    '<w:name w:val="Normal"/><w:qFormat/>'
+    '</w:style>'
+    '<w:style w:type="paragraph" w:styleId="Title">'
+    '<w:name w:val="Title"/><w:basedOn w:val="Normal"/><w:next w:val="Normal"/><w:qFormat/>'
+    '<w:pPr><w:spacing w:after="240"/></w:pPr>'
+    '<w:rPr><w:b/><w:color w:val="17365D"/><w:sz w:val="52"/><w:szCs w:val="52"/></w:rPr>'
+    '</w:style>'
+    '<w:style w:type="paragraph" w:styleId="Heading1">'
+    '<w:name w:val="heading 1"/><w:basedOn w:val="Normal"/><w:next w:val="Normal"/><w:qFormat/>'
+    '<w:pPr><w:keepNext/><w:spacing w:before="360" w:after="120"/><w:outlineLvl w:val="0"/></w:pPr>'
+    '<w:rPr><w:b/><w:sz w:val="28"/><w:szCs w:val="28"/></w:rPr>'
+    '</w:style>'
+    '</w:styles>'
+)
+
+_DOCX_DOCUMENT_HEAD = _XML_DECLARATION + f'<w:document xmlns:w="{_W_NS}"><w:body>'
+
+# US Letter with 1" top/bottom and 1.25" side margins
+_DOCX_DOCUMENT_TAIL = (
+    '<w:sectPr>'
+    '<w:pgSz w:w="12240" w:h="15840"/>'
+    '<w:pgMar w:top="1440" w:right="1800" w:bottom="1440" w:left="1800" '
+    'w:header="720" w:footer="720" w:gutter="0"/>'
+    '</w:sectPr>'
+    '</w:body></w:document>'
+)
+
+_DOCX_EMPTY_PARAGRAPH = "<w:p/>"
+_DOCX_PAGE_BREAK = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
 
 def _sanitize_text_for_pdf(text: str) -> str:
     """
@@ -192,20 +289,15 @@ def create_pdf(
     pdf.cell(95, 8, 'Date: ____________', 0, 1, 'R')
     pdf.ln(8)
 
-    # Question type labels
-    type_labels = {
-        "multiple_choice": "[MC]",
-        "true_false": "[T/F]",
-        "short_answer": "[SA]",
-        "matching": "[Match]",
-        "fill_in_blank": "[Fill]"
-    }
+    # Correct-option letter per question, taken from correct_answer_index
+    answer_letters = []
 
     # Questions
     for i, q in enumerate(quiz_data, 1):
         q_type = q.get("question_type", "multiple_choice")
         q_text = _sanitize_text_for_pdf(q.get("question_text", ""))
-        badge = type_labels.get(q_type, "")
+        badge = _TYPE_BADGES.get(q_type, "")
+        letter = ""
 
         # Question header
         pdf.set_font('Helvetica', 'B', 11)
@@ -217,12 +309,14 @@ def create_pdf(
 
         if q_type == "multiple_choice":
             options = q.get("options", [])
-            labels = ["A", "B", "C", "D"]
+            correct_idx = q.get("correct_answer_index", -1)
+            if isinstance(correct_idx, int) and 0 <= correct_idx < min(len(options), len(_OPTION_LABELS)):
+                letter = _OPTION_LABELS[correct_idx]
             for j, opt in enumerate(options):
-                if j < len(labels):
+                if j < len(_OPTION_LABELS):
                     opt_text = _sanitize_text_for_pdf(str(opt))[:200]
                     pdf.set_x(left_margin + 10)
-                    pdf.cell(effective_width - 10, 6, f"({labels[j]}) {opt_text}", 0, 1)
+                    pdf.cell(effective_width - 10, 6, f"({_OPTION_LABELS[j]}) {opt_text}", 0, 1)
             pdf.ln(2)
 
         elif q_type == "true_false":
@@ -249,6 +343,7 @@ def create_pdf(
             pdf.cell(effective_width - 10, 6, "Answer: _________________________________", 0, 1)
             pdf.ln(2)
 
+        answer_letters.append(letter)
         pdf.ln(3)
 
         # Check for page break with safe margin
@@ -271,6 +366,8 @@ def create_pdf(
             q_text = _sanitize_text_for_pdf(q.get("question_text", ""))
             correct = _sanitize_text_for_pdf(str(q.get("correct_answer", "")))
             explanation = _sanitize_text_for_pdf(q.get("explanation", ""))
+            if answer_letters[i - 1]:
+                correct = f"({answer_letters[i - 1]}) {correct}"
 
             # Question
             pdf.set_font('Helvetica', 'B', 10)
@@ -312,6 +409,60 @@ def create_pdf(
         raise Exception(f"PDF output conversion failed: {str(e)}")
 
 
+def _docx_paragraph(
+    runs: Tuple[Tuple[str, Dict[str, Any]], ...] = (),
+    left_indent: int = 0,
+    align: str = "",
+    style: str = ""
+) -> str:
+    """
+    Build the WordprocessingML for one paragraph.
+
+    Args:
+        runs: Sequence of (text, props) where props may contain
+              bold, italic, color (hex "RRGGBB") and size (half-points)
+        left_indent: Left indent in twips (1/1440 inch)
+        align: Paragraph justification ("center", ...) or "" for default
+        style: Paragraph style id from _DOCX_STYLES, or "" for Normal
+
+    Returns:
+        <w:p> element as a string
+    """
+    # Child order follows the CT_PPr schema sequence
+    p_pr = ""
+    if style:
+        p_pr += f'<w:pStyle w:val="{style}"/>'
+    if left_indent:
+        p_pr += f'<w:ind w:left="{left_indent}"/>'
+    if align:
+        p_pr += f'<w:jc w:val="{align}"/>'
+
+    parts = ["<w:p>"]
+    if p_pr:
+        parts.append(f"<w:pPr>{p_pr}</w:pPr>")
+
+    for text, props in runs:
+        # Child order follows the CT_RPr schema sequence
+        r_pr = ""
+        if props.get("bold"):
+            r_pr += "<w:b/>"
+        if props.get("italic"):
+            r_pr += "<w:i/>"
+        if props.get("color"):
+            r_pr += f'<w:color w:val="{props["color"]}"/>'
+        if props.get("size"):
+            r_pr += f'<w:sz w:val="{props["size"]}"/>'
+
+        parts.append("<w:r>")
+        if r_pr:
+            parts.append(f"<w:rPr>{r_pr}</w:rPr>")
+        text = _XML_INVALID_CHARS_RE.sub("", str(text))
+        parts.append(f'<w:t xml:space="preserve">{xml_escape(text)}</w:t></w:r>')
+
+    parts.append("</w:p>")
+    return "".join(parts)
+
+
 def create_docx(
     quiz_data: List[Dict[str, Any]],
     title: str = "Practice Quiz",
@@ -322,7 +473,9 @@ def create_docx(
     """
     Create a Word document from quiz data.
 
-    Creates an editable document with proper formatting.
+    Creates an editable document with proper formatting. The package is
+    written directly with zipfile: a .docx is a handful of XML parts, and
+    building the body as one string avoids an lxml call per paragraph.
 
     Args:
         quiz_data: List of question dictionaries
@@ -334,133 +487,108 @@ def create_docx(
     Returns:
         DOCX file as bytes
     """
-    from docx import Document
-    from docx.shared import Inches, Pt, RGBColor
-    from docx.enum.text import WD_ALIGN_PARAGRAPH
-    from docx.enum.style import WD_STYLE_TYPE
-
-    doc = Document()
-
-    # Set default font
-    style = doc.styles['Normal']
-    style.font.name = 'Arial'
-    style.font.size = Pt(11)
+    body = []
 
     # Title
-    title_para = doc.add_heading(title, level=0)
-    title_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    body.append(_docx_paragraph(((title, {}),), align="center", style="Title"))
 
     # Subtitle
     if subject or grade:
         info = f"{subject} - Grade {grade}" if subject and grade else (subject or f"Grade {grade}")
-        subtitle = doc.add_paragraph(info)
-        subtitle.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        subtitle.runs[0].font.size = Pt(12)
-        subtitle.runs[0].font.color.rgb = RGBColor(100, 100, 100)
+        body.append(_docx_paragraph(((info, {"size": 24, "color": "646464"}),), align="center"))
 
     # Date
-    date_para = doc.add_paragraph(f"Generated: {datetime.now().strftime('%B %d, %Y')}")
-    date_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    date_para.runs[0].font.italic = True
-    date_para.runs[0].font.size = Pt(9)
+    body.append(_docx_paragraph(
+        ((f"Generated: {datetime.now().strftime('%B %d, %Y')}", {"italic": True, "size": 18}),),
+        align="center"
+    ))
 
-    doc.add_paragraph()
+    body.append(_DOCX_EMPTY_PARAGRAPH)
 
     # Student section header
-    section_title = doc.add_heading('Student Worksheet', level=1)
-    section_title.runs[0].font.color.rgb = RGBColor(79, 70, 229)
+    body.append(_docx_paragraph((("Student Worksheet", {"color": "4F46E5"}),), style="Heading1"))
 
     # Name/Date line
-    name_date = doc.add_paragraph()
-    name_date.add_run("Name: _________________________    Date: ____________")
+    body.append(_docx_paragraph((("Name: _________________________    Date: ____________", {}),)))
 
-    doc.add_paragraph()
+    body.append(_DOCX_EMPTY_PARAGRAPH)
+
+    # Correct-option letter per question, taken from correct_answer_index
+    answer_letters = []
 
     # Questions
     for i, q in enumerate(quiz_data, 1):
         q_type = q.get("question_type", "multiple_choice")
         q_text = q.get("question_text", "")
-
-        type_labels = {
-            "multiple_choice": "[MC]",
-            "true_false": "[T/F]",
-            "short_answer": "[SA]"
-        }
-        badge = type_labels.get(q_type, "")
+        letter = ""
+        badge = _TYPE_BADGES.get(q_type, "")
 
         # Question paragraph
-        q_para = doc.add_paragraph()
-        q_num = q_para.add_run(f"{i}. {badge} ")
-        q_num.bold = True
-        q_para.add_run(q_text)
+        body.append(_docx_paragraph(((f"{i}. {badge} ", {"bold": True}), (q_text, {}))))
 
         # Options
         if q_type == "multiple_choice":
             options = q.get("options", [])
-            labels = ["A", "B", "C", "D"]
+            correct_idx = q.get("correct_answer_index", -1)
+            if isinstance(correct_idx, int) and 0 <= correct_idx < min(len(options), len(_OPTION_LABELS)):
+                letter = _OPTION_LABELS[correct_idx]
             for j, opt in enumerate(options):
-                if j < len(labels):
-                    opt_para = doc.add_paragraph()
-                    opt_para.paragraph_format.left_indent = Inches(0.5)
-                    opt_para.add_run(f"({labels[j]}) {opt}")
+                if j < len(_OPTION_LABELS):
+                    body.append(_docx_paragraph(((f"({_OPTION_LABELS[j]}) {opt}", {}),), left_indent=720))
 
         elif q_type == "true_false":
-            tf_para = doc.add_paragraph()
-            tf_para.paragraph_format.left_indent = Inches(0.5)
-            tf_para.add_run("(   ) True    (   ) False")
+            body.append(_docx_paragraph((("(   ) True    (   ) False", {}),), left_indent=720))
 
         else:  # short_answer
-            ans_para = doc.add_paragraph()
-            ans_para.paragraph_format.left_indent = Inches(0.5)
-            ans_para.add_run("Answer: _________________________________")
+            body.append(_docx_paragraph((("Answer: _________________________________", {}),), left_indent=720))
 
-        doc.add_paragraph()
+        answer_letters.append(letter)
+        body.append(_DOCX_EMPTY_PARAGRAPH)
 
     # Answer Key Section
     if include_answers:
-        doc.add_page_break()
+        body.append(_DOCX_PAGE_BREAK)
 
-        key_title = doc.add_heading('Teacher Answer Key', level=1)
-        key_title.runs[0].font.color.rgb = RGBColor(79, 70, 229)
+        body.append(_docx_paragraph((("Teacher Answer Key", {"color": "4F46E5"}),), style="Heading1"))
 
-        doc.add_paragraph()
+        body.append(_DOCX_EMPTY_PARAGRAPH)
 
         for i, q in enumerate(quiz_data, 1):
             q_text = q.get("question_text", "")
-            correct = q.get("correct_answer", "")
+            correct = str(q.get("correct_answer", ""))
             explanation = q.get("explanation", "")
+            if answer_letters[i - 1]:
+                correct = f"({answer_letters[i - 1]}) {correct}"
 
             # Question
-            q_para = doc.add_paragraph()
-            q_num = q_para.add_run(f"{i}. ")
-            q_num.bold = True
-            q_para.add_run(q_text)
+            body.append(_docx_paragraph(((f"{i}. ", {"bold": True}), (q_text, {}))))
 
             # Correct answer
-            ans_para = doc.add_paragraph()
-            ans_para.paragraph_format.left_indent = Inches(0.3)
-            ans_label = ans_para.add_run("Correct Answer: ")
-            ans_label.bold = True
-            ans_value = ans_para.add_run(correct)
-            ans_value.font.color.rgb = RGBColor(34, 197, 94)
+            body.append(_docx_paragraph(
+                (("Correct Answer: ", {"bold": True}), (correct, {"color": "22C55E"})),
+                left_indent=432
+            ))
 
             # Explanation
             if explanation:
-                exp_para = doc.add_paragraph()
-                exp_para.paragraph_format.left_indent = Inches(0.3)
-                exp_label = exp_para.add_run("Explanation: ")
-                exp_label.italic = True
-                exp_text = exp_para.add_run(explanation)
-                exp_text.font.color.rgb = RGBColor(100, 100, 100)
-                exp_text.font.size = Pt(10)
+                body.append(_docx_paragraph(
+                    (("Explanation: ", {"italic": True}), (explanation, {"color": "646464", "size": 20})),
+                    left_indent=432
+                ))
+
+            body.append(_DOCX_EMPTY_PARAGRAPH)
 
-            doc.add_paragraph()
+    document_xml = _DOCX_DOCUMENT_HEAD + "".join(body) + _DOCX_DOCUMENT_TAIL
 
     # Save to bytes
     doc_bytes = io.BytesIO()
-    doc.save(doc_bytes)
-    doc_bytes.seek(0)
-    return doc_bytes.read()
+    with zipfile.ZipFile(doc_bytes, "w", zipfile.ZIP_DEFLATED) as package:
+        package.writestr("[Content_Types].xml", _DOCX_CONTENT_TYPES)
+        package.writestr("_rels/.rels", _DOCX_PACKAGE_RELS)
+        package.writestr("word/_rels/document.xml.rels", _DOCX_DOCUMENT_RELS)
+        package.writestr("word/styles.xml", _DOCX_STYLES)
+        package.writestr("word/document.xml", document_xml)
+    return doc_bytes.getvalue()
 
 
 def create_json_export(
@@ -468,7 +596,8 @@ def create_json_export(
     metadata: Optional[Dict[str, Any]] = None,
     analysis_result: Optional[Dict[str, Any]] = None,
     quiz_settings: Optional[Dict[str, Any]] = None,
-    game_state: Optional[Dict[str, Any]] = None
+    game_state: Optional[Dict[str, Any]] = None,
+    created_at: Optional[str] = None
 ) -> str:
     """
     Create a JSON export of the quiz for sharing/importing.
@@ -485,6 +614,7 @@ def create_json_export(
         analysis_result: Optional vision analysis results (transcribed_text, etc.)
         quiz_settings: Optional generation settings (counts, difficulty)
         game_state: Optional game state for resume (current_index, score, streak)
+        created_at: Optional ISO timestamp; defaults to now
 
     Returns:
         JSON string with stable schema
@@ -495,7 +625,7 @@ def create_json_export(
 
     export_data = {
         "schema_version": QUIZ_SCHEMA_VERSION,
-        "created_at": datetime.now().isoformat(),
+        "created_at": created_at or datetime.now().isoformat(),
         "metadata": full_metadata,
         "questions": quiz_data
     }
@@ -520,7 +650,7 @@ def create_json_export(
     if game_state:
         export_data["game_state"] = game_state
 
-    return json.dumps(export_data, indent=2, ensure_ascii=False)
+    return dumps_json(export_data, indent=True)
 
 
 def import_from_json(json_string: str) -> Tuple[List[Dict], Dict, Optional[Dict], Optional[Dict], Optional[Dict]]:
@@ -544,7 +674,7 @@ def import_from_json(json_string: str) -> Tuple[List[Dict], Dict, Optional[Dict]
         ValueError: If JSON is invalid or format is unrecognized
     """
     try:
-        data = json.loads(json_string)
+        data = loads_json(json_string)
     except json.JSONDecodeError as e:
         raise ValueError(f"Invalid JSON: {str(e)}")
 
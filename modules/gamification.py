@@ -8,6 +8,7 @@ streak tracking, and scoring logic for engaging quiz experiences.
 import streamlit as st
 from typing import Optional, Tuple
 import base64
+import copy
 
 
 # Base64 encoded audio for sound effects (short, simple beeps)
@@ -28,35 +29,73 @@ STREAK_SOUND_BASE64 = """
 UklGRjIAAABXQVZFZm10IBAAAAABAAEARKwAAIhYAQACABAAZGF0YQAAAAA=
 """
 
+# HTML snippets, kept on one line: st.markdown sends them verbatim, so
+# indentation inside triple-quoted blocks is just extra payload per rerun
+_AUDIO_TEMPLATE = '<audio autoplay style="display:none;"><source src="data:audio/wav;base64,{sound_data}" type="audio/wav"></audio>'
+
+_CSS_CONFETTI_HTML = (
+    "<style>"
+    "@keyframes confetti-fall{0%{transform:translateY(-100vh) rotate(0deg);opacity:1;}"
+    "100%{transform:translateY(100vh) rotate(720deg);opacity:0;}}"
+    ".confetti-container{position:fixed;top:0;left:0;width:100%;height:100%;"
+    "pointer-events:none;overflow:hidden;z-index:9999;}"
+    ".confetti{position:absolute;width:10px;height:10px;animation:confetti-fall 3s ease-out forwards;}"
+    "</style>"
+    '<div class="confetti-container">'
+    '<div class="confetti" style="left:10%;background:#4F46E5;animation-delay:0s;"></div>'
+    '<div class="confetti" style="left:20%;background:#34D399;animation-delay:0.2s;"></div>'
+    '<div class="confetti" style="left:30%;background:#F87171;animation-delay:0.1s;"></div>'
+    '<div class="confetti" style="left:40%;background:#FBBF24;animation-delay:0.3s;"></div>'
+    '<div class="confetti" style="left:50%;background:#818CF8;animation-delay:0.15s;"></div>'
+    '<div class="confetti" style="left:60%;background:#34D399;animation-delay:0.25s;"></div>'
+    '<div class="confetti" style="left:70%;background:#4F46E5;animation-delay:0.05s;"></div>'
+    '<div class="confetti" style="left:80%;background:#F87171;animation-delay:0.35s;"></div>'
+    '<div class="confetti" style="left:90%;background:#FBBF24;animation-delay:0.4s;"></div>'
+    "</div>"
+)
+
+_STREAK_TEMPLATE = (
+    '<div class="{glow_class}" style="text-align:center;padding:0.5rem 1rem;'
+    "background:linear-gradient(135deg,#FF6B35 0%,#FF9F1C 100%);color:white;"
+    "border-radius:9999px;font-size:1.2rem;font-weight:600;font-family:'Fredoka',sans-serif;"
+    "display:inline-block;box-shadow:0 4px 15px rgba(255,107,53,0.4);"
+    'animation:pulse 2s ease-in-out infinite;">{fires} {streak} Streak!</div>'
+)
+
+_SCORE_POPUP_TEMPLATE = (
+    '<div class="pop" style="position:fixed;top:50%;left:50%;transform:translate(-50%,-50%);'
+    "font-size:3rem;font-weight:700;color:#34D399;z-index:9999;"
+    'text-shadow:0 2px 10px rgba(52,211,153,0.5);animation:scoreUp 1s ease forwards;">+{points}</div>'
+)
+
+_WRONG_POPUP_HTML = (
+    '<div class="shake" style="position:fixed;top:50%;left:50%;transform:translate(-50%,-50%);'
+    "font-size:3rem;font-weight:700;color:#F87171;z-index:9999;"
+    'text-shadow:0 2px 10px rgba(248,113,113,0.5);">✗</div>'
+)
+
+
+# Gamification session state defaults (mutable values are copied on init)
+_GAME_STATE_DEFAULTS = {
+    "score": 0,
+    "streak": 0,
+    "max_streak": 0,
+    "total_questions": 0,
+    "correct_answers": 0,
+    "wrong_answers_list": [],
+    "sound_enabled": True,
+    "animations_enabled": True,
+}
+
 
 def init_game_state() -> None:
     """
     Initialize all gamification-related session state variables.
     Call this at the start of your app.
     """
-    if "score" not in st.session_state:
-        st.session_state.score = 0
-
-    if "streak" not in st.session_state:
-        st.session_state.streak = 0
-
-    if "max_streak" not in st.session_state:
-        st.session_state.max_streak = 0
-
-    if "total_questions" not in st.session_state:
-        st.session_state.total_questions = 0
-
-    if "correct_answers" not in st.session_state:
-        st.session_state.correct_answers = 0
-
-    if "wrong_answers_list" not in st.session_state:
-        st.session_state.wrong_answers_list = []
-
-    if "sound_enabled" not in st.session_state:
-        st.session_state.sound_enabled = True
-
-    if "animations_enabled" not in st.session_state:
-        st.session_state.animations_enabled = True
+    for key, default in _GAME_STATE_DEFAULTS.items():
+        if key not in st.session_state:
+            st.session_state[key] = copy.copy(default)
 
 
 def reset_game_state() -> None:
@@ -90,11 +129,7 @@ def play_sound(sound_type: str) -> None:
     # Clean up the base64 string
     sound_data = sound_data.strip().replace("\n", "")
 
-    audio_html = f"""
-    <audio autoplay style="display:none;">
-        <source src="data:audio/wav;base64,{sound_data}" type="audio/wav">
-    </audio>
-    """
+    audio_html = _AUDIO_TEMPLATE.format(sound_data=sound_data)
 
     st.markdown(audio_html, unsafe_allow_html=True)
 
@@ -161,45 +196,7 @@ def show_celebration_animation(celebration_type: str = "confetti") -> None:
 
 def _show_css_confetti() -> None:
     """Fallback CSS-based confetti animation."""
-    confetti_html = """
-    <style>
-    @keyframes confetti-fall {
-        0% { transform: translateY(-100vh) rotate(0deg); opacity: 1; }
-        100% { transform: translateY(100vh) rotate(720deg); opacity: 0; }
-    }
-
-    .confetti-container {
-        position: fixed;
-        top: 0;
-        left: 0;
-        width: 100%;
-        height: 100%;
-        pointer-events: none;
-        overflow: hidden;
-        z-index: 9999;
-    }
-
-    .confetti {
-        position: absolute;
-        width: 10px;
-        height: 10px;
-        animation: confetti-fall 3s ease-out forwards;
-    }
-    </style>
-
-    <div class="confetti-container">
-        <div class="confetti" style="left: 10%; background: #4F46E5; animation-delay: 0s;"></div>
-        <div class="confetti" style="left: 20%; background: #34D399; animation-delay: 0.2s;"></div>
-        <div class="confetti" style="left: 30%; background: #F87171; animation-delay: 0.1s;"></div>
-        <div class="confetti" style="left: 40%; background: #FBBF24; animation-delay: 0.3s;"></div>
-        <div class="confetti" style="left: 50%; background: #818CF8; animation-delay: 0.15s;"></div>
-        <div class="confetti" style="left: 60%; background: #34D399; animation-delay: 0.25s;"></div>
-        <div class="confetti" style="left: 70%; background: #4F46E5; animation-delay: 0.05s;"></div>
-        <div class="confetti" style="left: 80%; background: #F87171; animation-delay: 0.35s;"></div>
-        <div class="confetti" style="left: 90%; background: #FBBF24; animation-delay: 0.4s;"></div>
-    </div>
-    """
-    st.markdown(confetti_html, unsafe_allow_html=True)
+    st.markdown(_CSS_CONFETTI_HTML, unsafe_allow_html=True)
 
 
 def check_answer(
@@ -419,23 +416,7 @@ def render_streak_indicator(streak: int) -> None:
 
     glow_class = "streak-fire" if streak >= 3 else ""
 
-    streak_html = f"""
-    <div class="{glow_class}" style="
-        text-align: center;
-        padding: 0.5rem 1rem;
-        background: linear-gradient(135deg, #FF6B35 0%, #FF9F1C 100%);
-        color: white;
-        border-radius: 9999px;
-        font-size: 1.2rem;
-        font-weight: 600;
-        font-family: 'Fredoka', sans-serif;
-        display: inline-block;
-        box-shadow: 0 4px 15px rgba(255, 107, 53, 0.4);
-        animation: pulse 2s ease-in-out infinite;
-    ">
-        {fires} {streak} Streak!
-    </div>
-    """
+    streak_html = _STREAK_TEMPLATE.format(glow_class=glow_class, fires=fires, streak=streak)
     st.markdown(streak_html, unsafe_allow_html=True)
 
 
@@ -448,37 +429,8 @@ def render_score_popup(points: int, is_correct: bool) -> None:
         is_correct: Whether the answer was correct
     """
     if is_correct:
-        popup_html = f"""
-        <div class="pop" style="
-            position: fixed;
-            top: 50%;
-            left: 50%;
-            transform: translate(-50%, -50%);
-            font-size: 3rem;
-            font-weight: 700;
-            color: #34D399;
-            z-index: 9999;
-            text-shadow: 0 2px 10px rgba(52, 211, 153, 0.5);
-            animation: scoreUp 1s ease forwards;
-        ">
-            +{points}
-        </div>
-        """
+        popup_html = _SCORE_POPUP_TEMPLATE.format(points=points)
     else:
-        popup_html = """
-        <div class="shake" style="
-            position: fixed;
-            top: 50%;
-            left: 50%;
-            transform: translate(-50%, -50%);
-            font-size: 3rem;
-            font-weight: 700;
-            color: #F87171;
-            z-index: 9999;
-            text-shadow: 0 2px 10px rgba(248, 113, 113, 0.5);
-        ">
-            ✗
-        </div>
-        """
+        popup_html = _WRONG_POPUP_HTML
 
     st.markdown(popup_html, unsafe_allow_html=True)
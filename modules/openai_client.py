@@ -0,0 +1,87 @@
+"""
+CIFE Edu-Suite - OpenAI Client Module
+======================================
+Shared OpenAI client for the vision and quiz generation modules.
+Clients are cached per API key so the underlying HTTP connection pool
+(and its keep-alive TLS connections) survives Streamlit reruns.
+Also provides the JSON helpers used for model responses and quiz files.
+"""
+
+import json
+from typing import Any
+
+import streamlit as st
+from openai import APIConnectionError, OpenAI, RateLimitError
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# The SDK retries 408/409/429/5xx and connection errors with exponential
+# backoff and jitter (honouring Retry-After); allow one more try than default
+MAX_RETRIES = 3
+
+# Per-request timeout in seconds (the SDK default is 10 minutes); vision and
+# quiz calls normally finish well under a minute
+REQUEST_TIMEOUT = 120.0
+
+# Errors that are still worth retrying after the SDK's own retries give up
+# (APITimeoutError subclasses APIConnectionError)
+TRANSIENT_API_ERRORS = (RateLimitError, APIConnectionError)
+
+
+@st.cache_resource(show_spinner=False)
+def get_openai_client(api_key: str) -> OpenAI:
+    """
+    Return a shared OpenAI client for the given API key.
+
+    Args:
+        api_key: OpenAI API key
+
+    Returns:
+        Cached OpenAI client instance
+    """
+    return OpenAI(
+        api_key=api_key,
+        max_retries=MAX_RETRIES,
+        timeout=REQUEST_TIMEOUT,
+    )
+
+
+def loads_json(content: str) -> Any:
+    """
+    Parse a JSON model response, using orjson when it is installed.
+
+    Args:
+        content: JSON text returned by the model
+
+    Returns:
+        Decoded Python object
+
+    Raises:
+        json.JSONDecodeError: If the content is not valid JSON
+            (orjson.JSONDecodeError subclasses it)
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def dumps_json(obj: Any, indent: bool = False) -> str:
+    """
+    Serialize to a UTF-8 JSON string, using orjson when it is installed.
+
+    Args:
+        obj: Object to serialize
+        indent: Pretty-print with two-space indentation
+
+    Returns:
+        JSON text (non-ASCII characters are kept as-is)
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode("utf-8")
+        except TypeError:
+            pass  # e.g. non-str dict keys; the stdlib encoder handles those
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False)
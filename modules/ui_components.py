@@ -8,7 +8,14 @@ Includes cards, buttons, progress bars, wizard steps, and styled containers.
 
 import streamlit as st
 from typing import Callable, Optional, List, Any
+import html
 import os
+import re
+
+# Stylesheet minification (comments, whitespace runs, space around punctuation)
+_CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+_CSS_WHITESPACE_RE = re.compile(r"\s+")
+_CSS_PUNCTUATION_RE = re.compile(r"\s*([{};,])\s*")
 
 
 def load_custom_css():
@@ -16,6 +23,22 @@ def load_custom_css():
     Load and inject the custom CSS file into the Streamlit app.
     Applies the Fredoka font globally and includes all required animations.
     """
+    # Inject the CSS using st.markdown with unsafe_allow_html=True.
+    # It must be re-emitted on every rerun, but the file is only read once.
+    st.markdown(_get_css_markup(), unsafe_allow_html=True)
+
+
+@st.cache_resource(show_spinner=False)
+def _get_css_markup() -> str:
+    """
+    Build the minified <style> block once per server process.
+
+    The block is re-sent to the browser on every rerun, so comments and
+    indentation are stripped (roughly a third of the stylesheet).
+
+    Returns:
+        The custom (or fallback) CSS wrapped in a <style> tag
+    """
     css_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "assets", "custom.css")
 
     if os.path.exists(css_path):
@@ -25,8 +48,11 @@ def load_custom_css():
         # Fallback inline CSS if file doesn't exist
         css_content = _get_fallback_css()
 
-    # Inject the CSS using st.markdown with unsafe_allow_html=True
-    st.markdown(f"<style>{css_content}</style>", unsafe_allow_html=True)
+    css_content = _CSS_COMMENT_RE.sub("", css_content)
+    css_content = _CSS_WHITESPACE_RE.sub(" ", css_content)
+    css_content = _CSS_PUNCTUATION_RE.sub(r"\1", css_content).strip()
+
+    return f"<style>{css_content}</style>"
 
 
 def _get_fallback_css() -> str:
@@ -166,6 +192,13 @@ def _get_fallback_css() -> str:
         background: linear-gradient(135deg, #EEF2FF 0%, #E0E7FF 100%);
     }
 
+    /* Select button under an option card */
+    div.option-button-container .stButton > button {
+        min-height: 60px !important;
+        border-radius: 20px !important;
+        margin-top: -0.5rem !important;
+    }
+
     .option-card.correct {
         border-color: var(--success-emerald);
         background: linear-gradient(135deg, #D1FAE5 0%, #A7F3D0 100%);
@@ -371,6 +404,14 @@ def render_header(title: str, subtitle: str = "", emoji: str = "") -> None:
     st.markdown(header_html, unsafe_allow_html=True)
 
 
+_CARD_COLORS = {
+    "default": ("#FFFFFF", "transparent"),
+    "success": ("linear-gradient(135deg, #D1FAE5 0%, #A7F3D0 100%)", "#34D399"),
+    "error": ("linear-gradient(135deg, #FEE2E2 0%, #FECACA 100%)", "#F87171"),
+    "warning": ("linear-gradient(135deg, #FEF3C7 0%, #FDE68A 100%)", "#FBBF24")
+}
+
+
 def render_card(
     content: str,
     title: str = "",
@@ -386,27 +427,13 @@ def render_card(
         variant: "default", "success", "error", "warning"
         custom_class: Additional CSS class
     """
-    
-    bg_colors = {
-        "default": "#FFFFFF",
-        "success": "linear-gradient(135deg, #D1FAE5 0%, #A7F3D0 100%)",
-        "error": "linear-gradient(135deg, #FEE2E2 0%, #FECACA 100%)",
-        "warning": "linear-gradient(135deg, #FEF3C7 0%, #FDE68A 100%)"
-    }
-
-    border_colors = {
-        "default": "transparent",
-        "success": "#34D399",
-        "error": "#F87171",
-        "warning": "#FBBF24"
-    }
-
     # Clean content: dedent triple-quoted HTML and strip outer whitespace
     import textwrap
     clean_content = textwrap.dedent(content).strip()
     
     # Build card style as single line
-    card_style = f"background:{bg_colors.get(variant, bg_colors['default'])};border:3px solid {border_colors.get(variant, 'transparent')};border-radius:24px;padding:2rem;margin:1rem 0;box-shadow:0 10px 15px -3px rgba(0,0,0,0.1);"
+    bg, border = _CARD_COLORS.get(variant, _CARD_COLORS["default"])
+    card_style = f"background:{bg};border:3px solid {border};border-radius:24px;padding:2rem;margin:1rem 0;box-shadow:0 10px 15px -3px rgba(0,0,0,0.1);"
     
     # Build title HTML if provided
     title_html = f'<h3 style="margin-top:0;font-family:Fredoka,sans-serif;font-weight:600;">{title}</h3>' if title else ''
@@ -417,6 +444,14 @@ def render_card(
     st.markdown(card_html, unsafe_allow_html=True)
 
 
+_CARD_BUTTON_COLORS = {
+    "primary": ("linear-gradient(135deg, #4F46E5 0%, #6366F1 100%)", "#4338CA"),
+    "success": ("linear-gradient(135deg, #34D399 0%, #10B981 100%)", "#059669"),
+    "error": ("linear-gradient(135deg, #F87171 0%, #EF4444 100%)", "#DC2626"),
+    "secondary": ("linear-gradient(135deg, #E5E7EB 0%, #D1D5DB 100%)", "#9CA3AF")
+}
+
+
 def render_card_button(
     text: str,
     key: str,
@@ -439,20 +474,9 @@ def render_card_button(
     Returns:
         True if button was clicked
     """
-    colors = {
-        "primary": ("linear-gradient(135deg, #4F46E5 0%, #6366F1 100%)", "#4338CA"),
-        "success": ("linear-gradient(135deg, #34D399 0%, #10B981 100%)", "#059669"),
-        "error": ("linear-gradient(135deg, #F87171 0%, #EF4444 100%)", "#DC2626"),
-        "secondary": ("linear-gradient(135deg, #E5E7EB 0%, #D1D5DB 100%)", "#9CA3AF")
-    }
-
-    bg, hover_bg = colors.get(variant, colors["primary"])
+    bg, hover_bg = _CARD_BUTTON_COLORS.get(variant, _CARD_BUTTON_COLORS["primary"])
     text_color = "#FFFFFF" if variant != "secondary" else "#374151"
 
-    # Inject custom styling for this button variant
-    custom_style = '<style>div[data-testid="stButton"] > button {min-height:60px !important;border-radius:24px !important;}</style>'
-    st.markdown(custom_style, unsafe_allow_html=True)
-
     # Use Streamlit's native button with custom key
     button_text = f"{icon} {text}" if icon else text
     clicked = st.button(
@@ -468,6 +492,14 @@ def render_card_button(
     return clicked
 
 
+_OPTION_LABEL_COLORS = {
+    "A": "#4F46E5",
+    "B": "#059669",
+    "C": "#DC2626",
+    "D": "#D97706"
+}
+
+
 def render_option_card(
     option_text: str,
     option_label: str,
@@ -513,14 +545,7 @@ def render_option_card(
         icon = ""
         animation_class = ""
 
-    label_colors = {
-        "A": "#4F46E5",
-        "B": "#059669",
-        "C": "#DC2626",
-        "D": "#D97706"
-    }
-
-    label_color = label_colors.get(option_label, "#4F46E5")
+    label_color = _OPTION_LABEL_COLORS.get(option_label, "#4F46E5")
 
     # Build styles as single lines
     card_style = f"background:{bg};border:3px solid {border};border-radius:20px;padding:1rem 1.5rem;min-height:60px;margin:0.5rem 0;display:flex;align-items:center;gap:1rem;transition:all 0.2s ease;opacity:{'0.7' if disabled else '1'};"
@@ -532,10 +557,8 @@ def render_option_card(
     card_html = f'<div class="option-card {animation_class}" style="{card_style}"><div style="{label_style}">{option_label}</div><div style="{text_style}">{option_text}</div>{icon_html}</div>'
     st.markdown(card_html, unsafe_allow_html=True)
 
-    # Use a native Streamlit button for click handling (styled to be less prominent)
-    button_style = '<style>div.option-button-container .stButton > button {min-height:60px !important;border-radius:20px !important;margin-top:-0.5rem !important;}</style>'
-    st.markdown(button_style, unsafe_allow_html=True)
-
+    # Use a native Streamlit button for click handling (styled by the
+    # option-button-container rule in the global stylesheet)
     clicked = st.button(
         f"Select {option_label}",
         key=key,
@@ -602,6 +625,21 @@ def render_score_display(
     st.markdown(score_html, unsafe_allow_html=True)
 
 
+def _question_badge_html(label: str, bg: str) -> str:
+    """Build the pill-shaped question type badge markup."""
+    badge_style = f"display:inline-block;padding:0.35rem 1rem;border-radius:9999px;font-size:0.85rem;font-weight:600;text-transform:uppercase;letter-spacing:0.5px;background:{bg};color:white;font-family:'Fredoka',sans-serif;"
+    return f'<span style="{badge_style}">{label}</span>'
+
+
+# Badge markup is fixed per question type, so build it once at import
+_QUESTION_BADGES = {
+    "multiple_choice": _question_badge_html("MC", "linear-gradient(135deg, #2AB7CA 0%, #38BDF8 100%)"),
+    "true_false": _question_badge_html("T/F", "linear-gradient(135deg, #9BC53D 0%, #84CC16 100%)"),
+    "short_answer": _question_badge_html("SA", "linear-gradient(135deg, #E04F80 0%, #F472B6 100%)")
+}
+_UNKNOWN_QUESTION_BADGE = _question_badge_html("?", "#6B7280")
+
+
 def render_question_badge(question_type: str) -> None:
     """
     Render a badge showing the question type.
@@ -609,17 +647,7 @@ def render_question_badge(question_type: str) -> None:
     Args:
         question_type: "multiple_choice", "true_false", or "short_answer"
     """
-    badges = {
-        "multiple_choice": ("MC", "linear-gradient(135deg, #2AB7CA 0%, #38BDF8 100%)"),
-        "true_false": ("T/F", "linear-gradient(135deg, #9BC53D 0%, #84CC16 100%)"),
-        "short_answer": ("SA", "linear-gradient(135deg, #E04F80 0%, #F472B6 100%)")
-    }
-
-    label, bg = badges.get(question_type, ("?", "#6B7280"))
-
-    badge_style = f"display:inline-block;padding:0.35rem 1rem;border-radius:9999px;font-size:0.85rem;font-weight:600;text-transform:uppercase;letter-spacing:0.5px;background:{bg};color:white;font-family:'Fredoka',sans-serif;"
-    badge_html = f'<span style="{badge_style}">{label}</span>'
-    st.markdown(badge_html, unsafe_allow_html=True)
+    st.markdown(_QUESTION_BADGES.get(question_type, _UNKNOWN_QUESTION_BADGE), unsafe_allow_html=True)
 
 
 def render_wizard_steps(
@@ -758,6 +786,26 @@ def render_empty_state(
     st.markdown(empty_html, unsafe_allow_html=True)
 
 
+_INFO_BOX_COLORS = {
+    "info": ("#EEF2FF", "#4F46E5", "💡"),
+    "success": ("#D1FAE5", "#059669", "✅"),
+    "warning": ("#FEF3C7", "#D97706", "⚠️"),
+    "error": ("#FEE2E2", "#DC2626", "❌")
+}
+
+
+def _info_box_html(message: str, variant: str = "info", icon: str = "") -> str:
+    """Build the markup for an information box (see render_info_box)."""
+    bg_color, text_color, default_icon = _INFO_BOX_COLORS.get(variant, _INFO_BOX_COLORS["info"])
+    display_icon = icon if icon else default_icon
+
+    box_style = f"background:{bg_color};border-radius:16px;padding:1rem 1.5rem;margin:1rem 0;display:flex;align-items:center;gap:1rem;border-left:4px solid {text_color};"
+    icon_style = "font-size:1.5rem;flex-shrink:0;"
+    text_style = f"font-family:'Fredoka',sans-serif;font-size:1rem;color:{text_color};"
+
+    return f'<div style="{box_style}"><div style="{icon_style}">{display_icon}</div><div style="{text_style}">{message}</div></div>'
+
+
 def render_info_box(
     message: str,
     variant: str = "info",
@@ -771,22 +819,40 @@ def render_info_box(
         variant: "info", "success", "warning", "error"
         icon: Optional emoji icon
     """
-    colors = {
-        "info": ("#EEF2FF", "#4F46E5", "💡"),
-        "success": ("#D1FAE5", "#059669", "✅"),
-        "warning": ("#FEF3C7", "#D97706", "⚠️"),
-        "error": ("#FEE2E2", "#DC2626", "❌")
-    }
+    st.markdown(_info_box_html(message, variant, icon), unsafe_allow_html=True)
 
-    bg_color, text_color, default_icon = colors.get(variant, colors["info"])
-    display_icon = icon if icon else default_icon
 
-    box_style = f"background:{bg_color};border-radius:16px;padding:1rem 1.5rem;margin:1rem 0;display:flex;align-items:center;gap:1rem;border-left:4px solid {text_color};"
-    icon_style = "font-size:1.5rem;flex-shrink:0;"
-    text_style = f"font-family:'Fredoka',sans-serif;font-size:1rem;color:{text_color};"
-    
-    info_html = f'<div style="{box_style}"><div style="{icon_style}">{display_icon}</div><div style="{text_style}">{message}</div></div>'
-    st.markdown(info_html, unsafe_allow_html=True)
+def render_review_list(questions: List[dict]) -> None:
+    """
+    Render missed questions as collapsible review items.
+
+    All items go out in a single markdown element rather than one
+    expander plus three info boxes per question.
+
+    Args:
+        questions: Question dicts with question_text, correct_answer
+            and optional explanation
+    """
+    summary_style = "cursor:pointer;font-family:'Fredoka',sans-serif;font-weight:600;color:#1F2937;padding:0.75rem 1rem;"
+    item_style = "background:white;border:1px solid #E5E7EB;border-radius:12px;margin:0.5rem 0;padding:0 1rem;"
+
+    items = []
+    for q in questions:
+        # Question content is plain text ("Is 3 < 5?"), so escape it before
+        # it goes into the markup; truncate first so no entity is cut in half
+        question_text = q.get("question_text", "")
+        summary_text = html.escape(question_text[:50])
+        parts = [
+            f'<details style="{item_style}"><summary style="{summary_style}">Question: {summary_text}...</summary>',
+            _info_box_html(f"Question: {html.escape(question_text)}", "info"),
+            _info_box_html(f"Correct Answer: {html.escape(str(q.get('correct_answer', '')))}", "success"),
+        ]
+        if q.get("explanation"):
+            parts.append(_info_box_html(f"Explanation: {html.escape(str(q['explanation']))}", "info", "💡"))
+        parts.append("</details>")
+        items.append("".join(parts))
+
+    st.markdown("".join(items), unsafe_allow_html=True)
 
 
 def render_stat_card(
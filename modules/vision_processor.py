@@ -6,9 +6,112 @@ Transcribes handwriting, detects subject, grade level, and core concepts.
 """
 
 import base64
+import copy
+import io
 import json
-from typing import Dict, Any, Optional, List
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple
+
+import streamlit as st
 from openai import OpenAI
+from PIL import Image, ImageOps
+
+from .openai_client import get_openai_client, loads_json
+
+# Handwriting transcription is well within gpt-4o-mini's reach at a
+# fraction of the latency and cost; set CIFE_VISION_MODEL=gpt-4o to compare
+VISION_MODEL = os.getenv("CIFE_VISION_MODEL", "gpt-4o-mini")
+
+# Notebook handwriting stays legible well below phone-camera resolution;
+# every extra pixel costs upload time, memory and image tiles
+MAX_IMAGE_DIMENSION = 1536
+JPEG_QUALITY = 80
+
+# Upright JPEGs this small are already cheap to send; re-encoding them
+# costs CPU and quality for almost no payload saving
+PASSTHROUGH_JPEG_DIMENSION = 1024
+
+# EXIF Orientation tag (1 = upright)
+_EXIF_ORIENTATION = 0x0112
+
+# Common function words for detect_language(); words are pulled out with a
+# regex so trailing punctuation ("la," / "the.") still matches, and \w is
+# Unicode-aware, so accented words tokenize whole
+_WORD_RE = re.compile(r"\w+")
+
+_SPANISH_INDICATORS = frozenset({
+    'que', 'de', 'el', 'la', 'los', 'las', 'es', 'en', 'un', 'una',
+    'por', 'con', 'para', 'como', 'pero', 'si', 'su', 'al', 'del',
+    'son', 'esta', 'esto', 'ese', 'eso', 'muy', 'bien', 'todo',
+    'puede', 'tiene', 'hace', 'cuando', 'donde', 'porque', 'hay',
+    'está', 'qué', 'cómo', 'cuál', 'cuándo', 'dónde', 'más', 'también'
+})
+
+_ENGLISH_INDICATORS = frozenset({
+    'the', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
+    'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would',
+    'could', 'should', 'may', 'might', 'must', 'shall', 'can',
+    'need', 'dare', 'ought', 'used', 'to', 'of', 'in', 'for',
+    'on', 'with', 'at', 'by', 'from', 'or', 'an', 'not'
+})
+
+# System prompt for pedagogical analysis
+_VISION_SYSTEM_PROMPT = """You are an expert pedagogue and educational content analyst.
+Your task is to analyze handwritten student notebook pages with precision and educational insight.
+
+When analyzing the image:
+1. TRANSCRIBE all visible handwritten text exactly as written (preserve any errors or unique spellings)
+2. IDENTIFY the academic subject (Math, Science, English/Language Arts, Social Studies, Art, Music, etc.)
+3. ESTIMATE the grade level (1-12) based on content complexity, vocabulary, and concepts
+4. EXTRACT the core learning concept being studied
+5. DETECT the language (English or Spanish)
+6. IDENTIFY key terms or vocabulary that are central to the content
+7. Note any diagrams, formulas, or visual elements present
+
+Respond ONLY with valid JSON in this exact format:
+{
+    "transcribed_text": "Full transcription of all text...",
+    "subject": "Math",
+    "detected_grade_level": "5",
+    "core_concept": "Long Division with Remainders",
+    "language": "English",
+    "confidence": 0.85,
+    "key_terms": ["dividend", "divisor", "quotient", "remainder"],
+    "visual_elements": ["division bracket diagram", "worked examples"],
+    "content_summary": "Brief 1-2 sentence summary of what the student is learning"
+}
+
+Important guidelines:
+- Be accurate but not overly critical of handwriting variations
+- Identify the MAIN subject even if multiple topics appear
+- Grade level should reflect the complexity of the CONTENT, not handwriting quality
+- Include ALL readable text in transcription
+- If uncertain about any field, provide best estimate with lower confidence score
+- Key terms should be actual vocabulary from the notes, not generic terms"""
+
+# Fallbacks for fields the model leaves out
+_DEFAULT_ANALYSIS = {
+    "transcribed_text": "",
+    "subject": "General",
+    "detected_grade_level": "5",
+    "core_concept": "Unknown",
+    "language": "English",
+    "confidence": 0.5,
+    "key_terms": [],
+    "visual_elements": [],
+    "content_summary": ""
+}
+
+# Upload extension -> MIME type for the data URL
+_MIME_TYPES = {
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'gif': 'image/gif',
+    'webp': 'image/webp'
+}
 
 
 def encode_image_to_base64(image_file) -> str:
@@ -22,7 +125,96 @@ def encode_image_to_base64(image_file) -> str:
         Base64 encoded string of the image
     """
     image_file.seek(0)
-    return base64.standard_b64encode(image_file.read()).decode("utf-8")
+    return base64.standard_b64encode(image_file.read()).decode("ascii")
+
+
+def _prepare_image(image_bytes: bytes, filename: str) -> Tuple[str, str]:
+    """
+    Downscale and recompress an image for the Vision API, then base64 it.
+
+    Phone photos are typically 4000x3000 at several MB; applying the EXIF
+    rotation, capping them at MAX_IMAGE_DIMENSION and re-encoding as JPEG
+    shrinks the payload by an order of magnitude. Small upright JPEGs and
+    files Pillow cannot read are sent unchanged.
+
+    Args:
+        image_bytes: Raw bytes of the uploaded image
+        filename: Original filename, used for the fallback MIME type
+
+    Returns:
+        (mime_type, base64_string) tuple
+    """
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            # Fast path: small, upright JPEGs go out byte-for-byte. Image.open
+            # only reads the header here, so nothing is decoded.
+            if (
+                img.format == "JPEG"
+                and img.mode in ("RGB", "L")
+                and max(img.size) <= PASSTHROUGH_JPEG_DIMENSION
+                and img.getexif().get(_EXIF_ORIENTATION, 1) == 1
+            ):
+                return "image/jpeg", base64.standard_b64encode(image_bytes).decode("ascii")
+
+            # Phones store portrait shots rotated with an EXIF flag; bake it in
+            # so the model doesn't read the page sideways
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION), Image.LANCZOS)
+
+            # JPEG has no alpha channel; flatten transparency onto white
+            if img.mode in ("RGBA", "LA", "P"):
+                img = img.convert("RGBA")
+                background = Image.new("RGB", img.size, (255, 255, 255))
+                background.paste(img, mask=img.getchannel("A"))
+                img = background
+            elif img.mode != "RGB":
+                img = img.convert("RGB")
+
+            buffer = io.BytesIO()
+            img.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    except (OSError, ValueError):
+        return get_image_mime_type(filename), base64.standard_b64encode(image_bytes).decode("ascii")
+
+    # Encode straight from the buffer's memory instead of copying it out first
+    with buffer.getbuffer() as jpeg_view:
+        encoded = base64.standard_b64encode(jpeg_view).decode("ascii")
+    return "image/jpeg", encoded
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _prepare_images(images: Tuple[Tuple[bytes, str], ...]) -> List[Tuple[str, str]]:
+    """
+    Cached batch wrapper around _prepare_image().
+
+    The cache is consulted here, on the script thread; the worker threads
+    only run the plain Pillow code, since Streamlit caches need a script
+    run context.
+
+    Args:
+        images: (image_bytes, filename) pairs in upload order
+
+    Returns:
+        List of (mime_type, base64_string) tuples in upload order
+    """
+    if len(images) <= 1:
+        return [_prepare_image(data, name) for data, name in images]
+
+    data, names = zip(*images)
+    with ThreadPoolExecutor(max_workers=min(8, len(images))) as executor:
+        return list(executor.map(_prepare_image, data, names))
+
+
+def encode_images(image_files: List) -> List[Tuple[str, str]]:
+    """
+    Downscale and encode several uploaded images to base64 in parallel.
+
+    Args:
+        image_files: List of Streamlit UploadedFile objects
+
+    Returns:
+        List of (mime_type, base64_string) tuples in upload order
+    """
+    return _prepare_images(tuple((f.getvalue(), f.name) for f in image_files))
 
 
 def get_image_mime_type(filename: str) -> str:
@@ -35,21 +227,14 @@ def get_image_mime_type(filename: str) -> str:
     Returns:
         MIME type string
     """
-    extension = filename.lower().split('.')[-1]
-    mime_types = {
-        'jpg': 'image/jpeg',
-        'jpeg': 'image/jpeg',
-        'png': 'image/png',
-        'gif': 'image/gif',
-        'webp': 'image/webp'
-    }
-    return mime_types.get(extension, 'image/jpeg')
+    return _MIME_TYPES.get(filename.rpartition('.')[2].lower(), 'image/jpeg')
 
 
 def analyze_notebook_image(
     image_file,
     api_key: str,
-    language_hint: str = "auto"
+    language_hint: str = "auto",
+    detail: str = "high"
 ) -> Dict[str, Any]:
     """
     Analyze a student notebook image using GPT-4o Vision.
@@ -61,6 +246,8 @@ def analyze_notebook_image(
         image_file: Streamlit UploadedFile object containing the notebook image
         api_key: OpenAI API key
         language_hint: "auto", "english", or "spanish" for language detection
+        detail: Vision detail level; "low" is a single cheap tile, fine for
+                large clear handwriting but worse on dense notes
 
     Returns:
         Dictionary containing:
@@ -79,46 +266,24 @@ def analyze_notebook_image(
     if not api_key or not api_key.strip():
         raise ValueError("OpenAI API key is required")
 
-    client = OpenAI(api_key=api_key)
+    mime_type, base64_image = encode_images([image_file])[0]
+    client = get_openai_client(api_key)
+    return _analyze_encoded_image(base64_image, mime_type, client, language_hint, detail)
 
-    # Encode the image
-    base64_image = encode_image_to_base64(image_file)
-    mime_type = get_image_mime_type(image_file.name)
-
-    # System prompt for pedagogical analysis
-    system_prompt = """You are an expert pedagogue and educational content analyst.
-Your task is to analyze handwritten student notebook pages with precision and educational insight.
-
-When analyzing the image:
-1. TRANSCRIBE all visible handwritten text exactly as written (preserve any errors or unique spellings)
-2. IDENTIFY the academic subject (Math, Science, English/Language Arts, Social Studies, Art, Music, etc.)
-3. ESTIMATE the grade level (1-12) based on content complexity, vocabulary, and concepts
-4. EXTRACT the core learning concept being studied
-5. DETECT the language (English or Spanish)
-6. IDENTIFY key terms or vocabulary that are central to the content
-7. Note any diagrams, formulas, or visual elements present
-
-Respond ONLY with valid JSON in this exact format:
-{
-    "transcribed_text": "Full transcription of all text...",
-    "subject": "Math",
-    "detected_grade_level": "5",
-    "core_concept": "Long Division with Remainders",
-    "language": "English",
-    "confidence": 0.85,
-    "key_terms": ["dividend", "divisor", "quotient", "remainder"],
-    "visual_elements": ["division bracket diagram", "worked examples"],
-    "content_summary": "Brief 1-2 sentence summary of what the student is learning"
-}
 
-Important guidelines:
-- Be accurate but not overly critical of handwriting variations
-- Identify the MAIN subject even if multiple topics appear
-- Grade level should reflect the complexity of the CONTENT, not handwriting quality
-- Include ALL readable text in transcription
-- If uncertain about any field, provide best estimate with lower confidence score
-- Key terms should be actual vocabulary from the notes, not generic terms"""
+def _analyze_encoded_image(
+    base64_image: str,
+    mime_type: str,
+    client: OpenAI,
+    language_hint: str = "auto",
+    detail: str = "high"
+) -> Dict[str, Any]:
+    """
+    Run the GPT-4o Vision analysis on an already base64-encoded image.
 
+    The client is passed in rather than looked up so this can run on a
+    worker thread. See analyze_notebook_image() for the returned structure.
+    """
     language_instruction = ""
     if language_hint == "spanish":
         language_instruction = "\n\nNote: The content is expected to be in Spanish. Transcribe in the original language."
@@ -127,11 +292,11 @@ Important guidelines:
 
     try:
         response = client.chat.completions.create(
-            model="gpt-4o",
+            model=VISION_MODEL,
             messages=[
                 {
                     "role": "system",
-                    "content": system_prompt + language_instruction
+                    "content": _VISION_SYSTEM_PROMPT + language_instruction
                 },
                 {
                     "role": "user",
@@ -144,47 +309,27 @@ Important guidelines:
                             "type": "image_url",
                             "image_url": {
                                 "url": f"data:{mime_type};base64,{base64_image}",
-                                "detail": "high"
+                                "detail": detail
                             }
                         }
                     ]
                 }
             ],
             max_tokens=2000,
-            temperature=0.3
+            temperature=0.3,
+            response_format={"type": "json_object"}
         )
 
-        # Extract and parse the response
-        content = response.choices[0].message.content.strip()
-
-        # Clean up potential markdown code blocks
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
+        # JSON mode guarantees a bare object, so no fence stripping is needed
+        content = response.choices[0].message.content
 
         # Parse JSON response
-        result = json.loads(content)
+        result = loads_json(content)
 
         # Ensure all required fields exist with defaults
-        default_result = {
-            "transcribed_text": "",
-            "subject": "General",
-            "detected_grade_level": "5",
-            "core_concept": "Unknown",
-            "language": "English",
-            "confidence": 0.5,
-            "key_terms": [],
-            "visual_elements": [],
-            "content_summary": ""
-        }
-
-        for key, default_value in default_result.items():
+        for key, default_value in _DEFAULT_ANALYSIS.items():
             if key not in result:
-                result[key] = default_value
+                result[key] = copy.copy(default_value)
 
         return result
 
@@ -209,7 +354,8 @@ Important guidelines:
 def analyze_multiple_images(
     image_files: List,
     api_key: str,
-    language_hint: str = "auto"
+    language_hint: str = "auto",
+    detail: str = "high"
 ) -> Dict[str, Any]:
     """
     Analyze multiple notebook images and combine the results.
@@ -218,12 +364,15 @@ def analyze_multiple_images(
         image_files: List of Streamlit UploadedFile objects
         api_key: OpenAI API key
         language_hint: Language detection hint
+        detail: Vision detail level ("high" or "low")
 
     Returns:
         Combined analysis result with merged transcriptions and unified metadata
     """
     if not image_files:
         raise ValueError("At least one image is required")
+    if not api_key or not api_key.strip():
+        raise ValueError("OpenAI API key is required")
 
     all_analyses = []
     all_text = []
@@ -231,23 +380,37 @@ def analyze_multiple_images(
     subjects = []
     grade_levels = []
 
-    for img_file in image_files:
-        try:
-            analysis = analyze_notebook_image(img_file, api_key, language_hint)
-            all_analyses.append(analysis)
-            all_text.append(analysis.get("transcribed_text", ""))
-            all_key_terms.update(analysis.get("key_terms", []))
-            subjects.append(analysis.get("subject", ""))
-
-            # Parse grade level
-            grade_str = analysis.get("detected_grade_level", "5")
-            try:
-                grade_levels.append(int(grade_str.replace("th", "").replace("st", "").replace("nd", "").replace("rd", "")))
-            except ValueError:
-                grade_levels.append(5)
+    # Encode every page up front so the per-image calls don't serialize on it
+    encoded_images = encode_images(image_files)
+    # Resolve the cached client here; worker threads have no script context
+    client = get_openai_client(api_key)
 
+    def _analyze(encoded: Tuple[str, str]) -> Dict[str, Any]:
+        mime_type, base64_image = encoded
+        try:
+            return _analyze_encoded_image(base64_image, mime_type, client, language_hint, detail)
         except Exception as e:
-            all_analyses.append({"error": str(e)})
+            return {"error": str(e)}
+
+    # Pages are independent, so overlap the Vision round-trips
+    with ThreadPoolExecutor(max_workers=min(8, len(encoded_images))) as executor:
+        page_results = list(executor.map(_analyze, encoded_images))
+
+    for analysis in page_results:
+        all_analyses.append(analysis)
+        if "transcribed_text" not in analysis:
+            continue  # The Vision call itself failed for this page
+
+        all_text.append(analysis.get("transcribed_text", ""))
+        all_key_terms.update(analysis.get("key_terms", []))
+        subjects.append(analysis.get("subject", ""))
+
+        # Parse grade level
+        grade_str = str(analysis.get("detected_grade_level", "5"))
+        try:
+            grade_levels.append(int(grade_str.replace("th", "").replace("st", "").replace("nd", "").replace("rd", "")))
+        except ValueError:
+            grade_levels.append(5)
 
     # Combine results
     combined_text = "\n\n---\n\n".join(filter(None, all_text))
@@ -294,26 +457,10 @@ def detect_language(text: str) -> str:
     Returns:
         "English" or "Spanish"
     """
-    spanish_indicators = [
-        'que', 'de', 'el', 'la', 'los', 'las', 'es', 'en', 'un', 'una',
-        'por', 'con', 'para', 'como', 'pero', 'si', 'su', 'al', 'del',
-        'son', 'esta', 'esto', 'ese', 'eso', 'muy', 'bien', 'todo',
-        'puede', 'tiene', 'hace', 'cuando', 'donde', 'porque', 'hay'
-    ]
-
-    english_indicators = [
-        'the', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
-        'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would',
-        'could', 'should', 'may', 'might', 'must', 'shall', 'can',
-        'need', 'dare', 'ought', 'used', 'to', 'of', 'in', 'for',
-        'on', 'with', 'at', 'by', 'from', 'or', 'an', 'not'
-    ]
-
-    text_lower = text.lower()
-    words = set(text_lower.split())
-
-    spanish_count = sum(1 for word in spanish_indicators if word in words)
-    english_count = sum(1 for word in english_indicators if word in words)
+    words = set(_WORD_RE.findall(text.lower()))
+
+    spanish_count = len(words & _SPANISH_INDICATORS)
+    english_count = len(words & _ENGLISH_INDICATORS)
 
     if spanish_count > english_count:
         return "Spanish"